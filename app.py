@@ -1,94 +1,80 @@
+import time
+START_TIME = time.perf_counter()  # Taken before the other imports, for the startup timings
+import getpass
+import json
 import os
-import yaml
+import queue
+import sqlite3
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, BooleanVar, DoubleVar
-import librosa
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import pyaudio
-import soundfile as sf
 import webbrowser
-import shutil
 import threading
+from classification import config_file_path, load_config, destination_path, unique_path
+from file_index import FileIndex
+from file_list_view import VirtualFileList
+from scanner import DirectoryScanner
+from prefetch import FeatureCache, Prefetcher
+from feature_store import FeatureStore
+from playback import PlaybackEngine
+from label_suggest import LabelIndex, label_from_path, mfcc_embedding
+from move_journal import MovePipeline
+from label_store import LabelStore
+from thumbnail_grid import ThumbnailGrid
+from thumbnails import ThumbnailCache
+from watcher import WatchBatch, create_watcher
+from timing import timings
+from audio_features import is_windowed, mfcc_span
 
 # Load configuration
-config_file_path = 'config.yaml'
-with open(config_file_path, 'r') as file:
-    config = yaml.safe_load(file)
-
-
-# Function to load audio file
-def load_audio(file_path):
-    audio, sr = librosa.load(file_path, sr=None)
-    return audio, sr
-
-
-# Function to plot waveform
-def plot_waveform(audio, sr, frame):
-    fig, ax = plt.subplots(figsize=(5, 2))
-    librosa.display.waveshow(audio, sr=sr, ax=ax)
-    ax.set_title("Waveform")
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-
-# Function to plot MFCC
-def plot_mfcc(audio, sr, frame):
-    fig, ax = plt.subplots(figsize=(5, 2))
-    mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-    librosa.display.specshow(mfccs, x_axis='time', ax=ax)
-    ax.set_title("MFCC")
-    fig.colorbar(librosa.display.specshow(mfccs, x_axis='time', ax=ax), ax=ax)
-    canvas = FigureCanvasTkAgg(fig, master=frame)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-
-
-# Function to classify audio file
-def classify_audio(file_path, label, secondary=False):
-    output_path = config['secondary_output_directory'] if secondary else config['output_directory']
-    output_path = os.path.join(output_path, label)
-    os.makedirs(output_path, exist_ok=True)
-    new_file_path = os.path.join(output_path, os.path.basename(file_path))
+config = load_config(config_file_path)
+
+
+# Function to classify audio file. Without ask, a name that is taken gets a number
+# appended instead of a prompt, as when classifying many clips at once.
+def classify_audio(file_path, label, secondary=False, ask=True):
+    if app.label_store is not None:
+        return app.record_label(file_path, label, secondary)
+    new_file_path = destination_path(config, file_path, label, secondary)
+    if os.path.abspath(new_file_path) == os.path.abspath(file_path):
+        app.update_status(f"Already classified as {label}: {file_path}")
+        return file_path
+    if not ask:
+        new_file_path = unique_path(new_file_path, app.move_pipeline.pending_destinations())
 
     status_message = ""
-    if os.path.exists(new_file_path):
+    # A queued move to the same name counts as existing, it will be there by the time this one runs
+    if os.path.exists(new_file_path) or app.move_pipeline.is_pending(new_file_path):
         result = messagebox.askquestion("File Exists", "The file already exists. Do you want to overwrite it?",
                                         icon='warning')
         if result == 'yes':
-            os.remove(new_file_path)
-            shutil.move(file_path, new_file_path)
-            status_message = f"Success: File overwritten successfully.\n{file_path} -> {new_file_path}"
+            app.move_pipeline.submit(file_path, new_file_path, label, overwrite=True)
+            status_message = f"Moving: Overwriting existing file.\n{file_path} -> {new_file_path}"
         else:
             delete_result = messagebox.askquestion("Delete Original", "Do you want to delete the original file?",
                                                    icon='warning')
             if delete_result == 'yes':
                 os.remove(file_path)
                 status_message = f"Deleted: The original file has been deleted.\n{file_path}"
+                new_file_path = None
+            else:
+                new_file_path = file_path  # Nothing was changed on disk
     else:
-        shutil.move(file_path, new_file_path)
-        status_message = f"Success: File moved successfully.\n{file_path} -> {new_file_path}"
+        app.move_pipeline.submit(file_path, new_file_path, label)
+        status_message = f"Moving: {file_path} -> {new_file_path}"
 
     app.update_status(status_message)
+    return new_file_path  # None if the original was deleted
 
 
-# Function to play audio using PyAudio with volume control
-def play_audio_with_pyaudio(file_path, lock, volume):
-    with lock:
-        audio, sr = sf.read(file_path)
-        audio = audio * (volume / 100.0)  # Adjust volume
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paFloat32, channels=1, rate=sr, output=True)
-        stream.write(audio.astype(np.float32).tobytes())
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-
-
-def threaded_play_audio(file_path, lock, volume):
-    threading.Thread(target=play_audio_with_pyaudio, args=(file_path, lock, volume)).start()
+# Function to move a file into the "unknown" folder of the output directory, numbering the
+# name if it is taken
+def move_to_unknown(file_path):
+    if app.label_store is not None:
+        return app.record_label(file_path, 'unknown')
+    new_file_path = unique_path(destination_path(config, file_path, 'unknown'),
+                                app.move_pipeline.pending_destinations())
+    app.move_pipeline.submit(file_path, new_file_path, 'unknown')
+    return new_file_path
 
 
 # Custom "About" dialog class
@@ -130,8 +116,13 @@ class ShortcutsDialog(simpledialog.Dialog):
             "Left Arrow: Previous File\n"
             "Enter: Classify as Default\n"
             "Ctrl+U: Classify as Unknown\n"
+            "Ctrl+Z: Undo Last Move\n"
+            "Ctrl+S: Commit Labels (shared labelling)\n"
+            "Ctrl+G: Toggle Thumbnail Grid\n"
+            "Ctrl+T: Show Timings\n"
             "Ctrl+A: About\n"
             "Ctrl+K: Keyboard Shortcuts Help\n"
+            "Ctrl+1, Ctrl+2, ...: Classify as Suggested Label\n"
         )
         tk.Label(master, text=shortcuts_text, justify=tk.LEFT).pack(anchor=tk.W)
 
@@ -142,6 +133,47 @@ class ShortcutsDialog(simpledialog.Dialog):
         box.pack()
 
 
+# Non-modal panel with rolling p50/p95 timings of each stage, refreshed every second
+class TimingsWindow(tk.Toplevel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Timings")
+        self.text = tk.Label(self, justify=tk.LEFT, font=("Courier", 10), anchor=tk.NW)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        tk.Button(self, text="Reset", width=10, command=timings.reset).pack(pady=5)
+        self.refresh()
+
+    def refresh(self):
+        self.text.config(text=timings.summary())
+        self.after(1000, self.refresh)
+
+
+# Non-modal panel with the per-label and per-annotator counts of the shared label
+# database, refreshed every two seconds
+class LabelCountsWindow(tk.Toplevel):
+    def __init__(self, parent, label_store):
+        super().__init__(parent)
+        self.title("Label Counts")
+        self.label_store = label_store
+        self.text = tk.Label(self, justify=tk.LEFT, font=("Courier", 10), anchor=tk.NW)
+        self.text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.refresh()
+
+    def refresh(self):
+        try:
+            label_counts = self.label_store.label_counts()
+            annotator_counts = self.label_store.annotator_counts()
+        except sqlite3.Error as error:
+            self.text.config(text=f"Label database unavailable: {error}")
+        else:
+            lines = [f"{label:<28} {count:>7}" for label, count in sorted(label_counts.items())]
+            lines.append("")
+            lines.extend(f"{annotator:<20} {labelled:>7} labelled, {pending} not moved yet"
+                         for annotator, (labelled, pending) in sorted(annotator_counts.items()))
+            self.text.config(text="\n".join(lines))
+        self.after(2000, self.refresh)
+
+
 # GUI Application
 class AudioClassifierApp(tk.Tk):
     def __init__(self):
@@ -149,23 +181,73 @@ class AudioClassifierApp(tk.Tk):
         self.title("Audio Classifier")
         self.geometry(config['resolution'])
 
-        self.auto_play_sound = BooleanVar(value=config.get('auto_play_sound', True))
-        self.audio_play_lock = threading.Lock()  # Lock for controlling audio playback
+        # Menu settings changed in the application are kept in the cache directory, so
+        # config.yaml and its comments are never rewritten
+        self.settings_path = os.path.join(config.get('cache_directory', '.cache'), 'settings.json')
+        self.settings = self.load_settings()
+        self.auto_play_sound = BooleanVar(value=self.settings.get('auto_play_sound',
+                                                                  config.get('auto_play_sound', False)))
+        self.playback = PlaybackEngine()  # Shared PyAudio instance for all playback
         self.is_refreshing = False  # Flag to track if the list is being refreshed
         self.file_count = 0  # To keep track of the number of files in the list
         self.volume = DoubleVar(value=100)  # Volume control variable
+        self.volume.trace_add('write', lambda *args: self.playback.set_volume(self.volume.get()))
+        self.file_index = FileIndex('', config['output_directory'])  # Paths in list order
+        self.label_index = LabelIndex()  # Embeddings of classified clips for label suggestions
+        self.label_index_stop = threading.Event()
+        self.move_pipeline = MovePipeline(os.path.join(config.get('cache_directory', '.cache'), 'moves.jsonl'),
+                                          history=config.get('undo_history', 1000))
+        self.thumbnail_cache = ThumbnailCache(config.get('cache_directory', '.cache'),
+                                              workers=config.get('thumbnail_workers'))
+        self.label_store = None  # Shared label database, when label_store is configured
+        self.labelled_paths = set()  # Files labelled in the label store but not moved yet
+        self.sessions = []  # (session, annotator) of every live session, each labelling its own share
+        self.commits = {}  # Move pipeline record id -> label id, for moves made by a commit
+        if config.get('label_store'):
+            self.label_store = LabelStore(config['label_store'], config['input_directory'],
+                                          config.get('annotator') or getpass.getuser(),
+                                          lease_seconds=config.get('lease_seconds', 300))
+            self.label_store.recover()
+            self.labelled_paths = self.label_store.labelled_paths()
+            self.sessions = self.label_store.active_sessions()
+            auto_play_sound = self.label_store.get_setting('auto_play_sound', str(self.auto_play_sound.get()))
+            self.auto_play_sound.set(auto_play_sound == 'True')
+        self.grid_visible = BooleanVar(value=False)
+        self.grid_selecting = False  # Set while the list follows a click in the thumbnail grid
+        self.label_counts_window = None
         self.setup_ui()
         self.current_file = None
-        self.audio = None
-        self.sr = None
+        self.select_time = None  # When the current file was selected, for the timings
+        self.play_position = 0.0  # Seconds into the current file where playback starts
+        self.features = None  # Waveform envelope and MFCC of the current file, None while loading
+        self.prefetcher = Prefetcher(FeatureCache(config.get('feature_cache_mb', 256) * 1024 * 1024),
+                                     store=FeatureStore(config.get('cache_directory', '.cache')),
+                                     workers=config.get('prefetch_workers', 2))
         self.initial_directory = None
-        self.file_path_map = {}  # To map display paths to actual file paths
+        self.scanner = DirectoryScanner(os.path.join(config.get('cache_directory', '.cache'), 'scan_manifest.json'),
+                                        workers=config.get('scan_workers', 16))
+        self.watcher = None  # Reports files added or removed on disk after a load
+        self.scan_lock = threading.Lock()  # One background scan at a time
+        self.scan_results = queue.Queue()  # (generation, directory, file paths, watcher) of finished scans
+        self.load_generation = 0  # Bumped by every load; results of older scans are dropped
+        self.warm_up_done = threading.Event()
+        self.warm_up_error = None
+        self.timings_window = None
 
         # Force a redraw of the GUI
         self.update_idletasks()
 
         # Automatically load directory if valid
         self.auto_load_directory()
+        self.poll_prefetch()
+        self.poll_moves()
+        self.poll_thumbnails()
+        self.poll_watcher()
+        self.poll_scan()
+        self.poll_label_store()
+        self.after_idle(self.start_warm_up)
+        if self.move_pipeline.recovered:
+            self.update_status("Recovered interrupted moves:\n" + "\n".join(self.move_pipeline.recovered))
 
         # Bind keyboard shortcuts
         self.bind("<Control-l>", lambda event: self.load_directory())
@@ -176,6 +258,12 @@ class AudioClassifierApp(tk.Tk):
         self.bind("<Control-u>", lambda event: self.quick_action('unknown'))
         self.bind("<Control-a>", lambda event: self.show_about())
         self.bind("<Control-k>", lambda event: self.show_shortcuts())
+        self.bind("<Control-z>", lambda event: self.undo_move())
+        self.bind("<Control-s>", lambda event: self.commit_labels())
+        self.bind("<Control-t>", lambda event: self.show_timings())
+        self.bind("<Control-g>", lambda event: self.toggle_thumbnail_grid(not self.grid_visible.get()))
+        for number in range(1, len(self.suggestion_buttons) + 1):
+            self.bind(f"<Control-Key-{number}>", lambda event, n=number: self.classify_suggestion(n - 1))
 
     def setup_ui(self):
         self.create_menu_bar()
@@ -202,6 +290,15 @@ class AudioClassifierApp(tk.Tk):
         self.mfcc_frame = tk.Frame(self.visualization_frame)
         self.mfcc_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
+        # The plots are created once matplotlib has been imported in the background
+        self.visualization_panel = None
+        self.loading_label = tk.Label(self.waveform_frame, text="Loading plots...")
+        self.loading_label.pack(fill=tk.BOTH, expand=True)
+
+        # Thumbnail grid, shown in place of the visualizations from the View menu
+        self.thumbnail_grid = ThumbnailGrid(self.visualization_pane, self.file_index, self.thumbnail_cache)
+        self.thumbnail_grid.bind('<<GridSelect>>', self.on_grid_select)
+
         self.volume_frame = tk.Frame(self.visualization_frame)
         self.volume_frame.pack(side=tk.RIGHT, fill=tk.Y)
         tk.Label(self.volume_frame, text="Volume").pack()
@@ -228,19 +325,8 @@ class AudioClassifierApp(tk.Tk):
                                                  command=self.organize_by_path_name)
         self.organize_by_path_button.pack(side=tk.RIGHT)
 
-        self.scrollbar_y = tk.Scrollbar(self.file_list_frame, orient=tk.VERTICAL)
-        self.scrollbar_x = tk.Scrollbar(self.file_list_frame, orient=tk.HORIZONTAL)
-
-        self.file_list = tk.Listbox(self.file_list_frame, yscrollcommand=self.scrollbar_y.set,
-                                    xscrollcommand=self.scrollbar_x.set, width=int(config['file_panel_width'] / 10))
+        self.file_list = VirtualFileList(self.file_list_frame, self.file_index)
         self.file_list.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.file_list.config(justify=tk.RIGHT)
-
-        self.scrollbar_y.config(command=self.file_list.yview)
-        self.scrollbar_x.config(command=self.file_list.xview)
-
-        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
 
         self.file_list.bind('<<ListboxSelect>>', self.on_file_select)
 
@@ -258,6 +344,16 @@ class AudioClassifierApp(tk.Tk):
                                 command=lambda a=action: self.quick_action(a), height=3, bg=color)
                 btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
 
+        # Suggested labels from the most similar classified clips
+        self.suggestion_frame = tk.Frame(self.classification_frame)
+        self.suggestion_frame.pack(fill=tk.X)
+        tk.Label(self.suggestion_frame, text="Suggested:").pack(side=tk.LEFT, padx=5)
+        self.suggestion_buttons = []
+        for _ in range(config.get('suggestion_count', 3)):
+            btn = tk.Button(self.suggestion_frame, text="-", state='disabled', height=2, width=20)
+            btn.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+            self.suggestion_buttons.append(btn)
+
         # Primary classifications
         self.primary_classification_frame = tk.Frame(self.classification_frame)
         self.primary_classification_frame.pack(fill=tk.X, pady=10)
@@ -291,11 +387,26 @@ class AudioClassifierApp(tk.Tk):
 
         file_menu = tk.Menu(menu_bar, tearoff=0)
         file_menu.add_command(label="Load Directory", command=self.load_directory)
+        if self.label_store is not None:
+            file_menu.add_command(label="Commit Labels", accelerator="Ctrl+S", command=self.commit_labels)
         file_menu.add_separator()
         file_menu.add_checkbutton(label="Auto Play Sound", onvalue=True, offvalue=False, variable=self.auto_play_sound,
                                   command=self.toggle_auto_play_sound)
         menu_bar.add_cascade(label="File", menu=file_menu)
 
+        edit_menu = tk.Menu(menu_bar, tearoff=0)
+        edit_menu.add_command(label="Undo Move", accelerator="Ctrl+Z", command=self.undo_move)
+        menu_bar.add_cascade(label="Edit", menu=edit_menu)
+
+        view_menu = tk.Menu(menu_bar, tearoff=0)
+        view_menu.add_checkbutton(label="Thumbnail Grid", accelerator="Ctrl+G", onvalue=True, offvalue=False,
+                                  variable=self.grid_visible,
+                                  command=lambda: self.toggle_thumbnail_grid(self.grid_visible.get()))
+        view_menu.add_command(label="Timings", accelerator="Ctrl+T", command=self.show_timings)
+        if self.label_store is not None:
+            view_menu.add_command(label="Label Counts", command=self.show_label_counts)
+        menu_bar.add_cascade(label="View", menu=view_menu)
+
         help_menu = tk.Menu(menu_bar, tearoff=0)
         help_menu.add_command(label="About", command=self.show_about)
         help_menu.add_command(label="Keyboard Shortcuts", command=self.show_shortcuts)
@@ -309,127 +420,603 @@ class AudioClassifierApp(tk.Tk):
     def show_shortcuts(self):
         ShortcutsDialog(self)
 
+    def show_timings(self):
+        if self.timings_window is None or not self.timings_window.winfo_exists():
+            self.timings_window = TimingsWindow(self)
+        self.timings_window.lift()
+
+    def show_label_counts(self):
+        if self.label_counts_window is None or not self.label_counts_window.winfo_exists():
+            self.label_counts_window = LabelCountsWindow(self, self.label_store)
+        self.label_counts_window.lift()
+
     def auto_load_directory(self):
         input_directory = config.get('input_directory')
         if (input_directory and os.path.exists(input_directory)):
             self.load_directory(input_directory)
             self.initial_directory = input_directory
 
+    # Show the list from the last scan right away when there is one, then rescan in the
+    # background and apply whatever changed since
     def load_directory(self, directory=None):
         if directory is None:
             directory = filedialog.askdirectory(initialdir=config['input_directory'])
         if directory:
-            self.is_refreshing = True  # Set the refreshing flag
             self.initial_directory = directory
-            self.file_list.delete(0, tk.END)
-            self.file_paths = []
-            self.file_path_map = {}  # Clear the mapping dictionary
-            self.parent_path_len = len(directory) + 1
-            for root, _, files in os.walk(directory):
-                for file in files:
-                    if file.endswith(('.wav', '.mp3', '.flac')):
-                        file_path = os.path.join(root, file)
-                        self.file_paths.append(file_path)
-            self.load_classified_files()
-            self.organize_by_file_name()
-            self.file_count = len(self.file_paths)  # Update the file count after loading the directory
-            self.is_refreshing = False  # Reset the refreshing flag
+            self.load_generation += 1
+            cached_paths = self.scanner.cached_files(directory)
+            if cached_paths is not None:
+                cached_paths.extend(self.scanner.cached_files(config['output_directory']) or [])
+                self.show_file_paths(directory, cached_paths)
+                self.update_status(f"Loaded {self.file_count} files from the last scan, checking for changes...")
+            else:
+                self.update_status(f"Scanning {directory}...")
+            threading.Thread(target=self.scan_directories, args=(directory, self.load_generation),
+                             daemon=True).start()
+
+    @timings.timed('load_directory')
+    def show_file_paths(self, directory, file_paths):
+        self.is_refreshing = True  # Set the refreshing flag
+        self.file_index = FileIndex(directory, config['output_directory'])
+        self.file_index.load(self.listable(file_paths))
+        self.file_list.set_model(self.file_index)
+        self.thumbnail_grid.set_model(self.file_index)
+        self.build_label_index()
+        self.organize_by_file_name()
+        self.file_count = len(self.file_index)  # Update the file count after loading the directory
+        self.is_refreshing = False  # Reset the refreshing flag
+
+    # Scan both trees and set up the watcher; runs on a background thread
+    def scan_directories(self, directory, generation):
+        with self.scan_lock:
+            file_paths = self.scanner.scan(directory)
+            file_paths.extend(self.load_classified_files())
+            self.scanner.save()
+            watcher = None
+            if config.get('watch_directories', True):
+                watcher = create_watcher([directory, config['output_directory']], self.scanner.entries,
+                                         poll_interval=config.get('watch_poll_seconds', 2))
+        self.scan_results.put((generation, directory, file_paths, watcher))
+
+    # Pick up finished scans: show the list, or correct the one loaded from the last scan
+    def poll_scan(self):
+        while True:
+            try:
+                generation, directory, file_paths, watcher = self.scan_results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.load_generation:
+                if watcher is not None:
+                    watcher.stop()
+                continue
+            if self.file_index.roots[0] == os.path.normpath(directory):
+                listed = set(self.file_index.row_of)
+                found = set(file_paths)
+                # Checked again now, as this app may have moved files while the scan ran
+                added = [path for path in found - listed if os.path.exists(path)]
+                removed = [path for path in listed - found if not os.path.exists(path)]
+                self.apply_file_changes(WatchBatch(added, removed, [], False))
+            else:
+                self.show_file_paths(directory, file_paths)
+            if self.watcher is not None:
+                self.watcher.stop()
+            self.watcher = watcher
+            unclassified_count, classified_count = self.file_index.counts()
+            self.update_status(f"Loaded {self.file_count} files: {unclassified_count} unclassified, "
+                               f"{classified_count} classified")
+        self.after(50, self.poll_scan)
+
+    # Import the plotting and audio stacks and open the audio device off the UI thread,
+    # once the window is on screen
+    def start_warm_up(self):
+        timings.record('startup_window', time.perf_counter() - START_TIME)
+        threading.Thread(target=self.warm_up, daemon=True).start()
+        self.poll_warm_up()
+
+    def warm_up(self):
+        try:
+            import numpy as np
+            import librosa
+            import visualization  # noqa: F401 (matplotlib and the TkAgg backend)
+            librosa.feature.mfcc(y=np.zeros(4096, dtype=np.float32), sr=22050)  # First call sets up caches
+            self.playback.warm_up()
+        except Exception as error:
+            self.warm_up_error = error
+        self.warm_up_done.set()
+
+    def poll_warm_up(self):
+        if not self.warm_up_done.is_set():
+            self.after(50, self.poll_warm_up)
+            return
+        from visualization import VisualizationPanel
+        self.loading_label.destroy()
+        self.visualization_panel = VisualizationPanel(self.header_frame, self.waveform_frame, self.mfcc_frame,
+                                                      on_seek=self.seek)
+        timings.record('startup_ready', time.perf_counter() - START_TIME)
+        if self.warm_up_error is not None:
+            self.update_status(f"Error: {self.warm_up_error}")
+        if self.current_file:
+            self.update_visualizations()
 
     def load_classified_files(self):
-        for root, _, files in os.walk(config['output_directory']):
-            for file in files:
-                if file.endswith(('.wav', '.mp3', '.flac')):
-                    file_path = os.path.join(root, file)
-                    self.file_paths.append(file_path)
+        return self.scanner.scan(config['output_directory'])
 
+    @timings.timed('organize')
     def organize_by_file_name(self):
+        self.file_index.resort('name')
+        self.populate_file_list()
+
+    @timings.timed('organize')
+    def organize_by_path_name(self):
+        self.file_index.resort('path')
+        self.populate_file_list()
+
+    def populate_file_list(self):
         self.is_refreshing = True  # Set the refreshing flag
         # Save the current scroll position
         current_scroll_pos = self.file_list.yview()
 
-        self.file_list.delete(0, tk.END)
-        self.file_path_map.clear()  # Clear the mapping dictionary
-        file_names = sorted(self.file_paths, key=lambda x: os.path.basename(x))
-        for file in file_names:
-            display_path = file[self.parent_path_len:] if self.initial_directory in file else os.path.relpath(file,
-                                                                                                              config[
-                                                                                                                  'output_directory'])
-            self.file_list.insert(tk.END, display_path)
-            self.file_path_map[display_path] = file  # Map display path to actual file path
-            if config['output_directory'] in file:
-                self.file_list.itemconfig(tk.END, {'fg': 'grey'})
+        self.file_list.select_clear(0, tk.END)
         if self.file_list.size() > 0:
             self.file_list.select_set(0)
             self.file_list.event_generate("<<ListboxSelect>>")
-        self.file_list.xview_moveto(1)
 
         # Reapply the saved scroll position if the number of files is similar and more than 0
         if self.file_list.size() > 0 and abs(self.file_list.size() - self.file_count) <= 2:
             self.file_list.yview_moveto(current_scroll_pos[0])
+        self.thumbnail_grid.refresh()
 
         self.is_refreshing = False  # Reset the refreshing flag
 
-    def organize_by_path_name(self):
-        self.is_refreshing = True  # Set the refreshing flag
-        # Save the current scroll position
+    # Apply a single move to the list without rescanning the directories. Moves run in
+    # the background, so this is applied before the file has actually arrived.
+    def apply_file_move(self, old_path, new_path):
+        if old_path == new_path:
+            return
+        if old_path not in self.file_index and self.file_index.is_listed(old_path):
+            # The list no longer matches what is on disk, fall back to a full rescan
+            self.load_directory(self.initial_directory)
+            return
+
+        self.file_index.remove(old_path)  # Nothing to remove for secondary_output_directory
+        if new_path is not None and self.file_index.is_listed(new_path):
+            self.file_index.remove(new_path)  # Overwritten destination
+            self.file_index.insert(new_path)
+        self.file_list.refresh()
+        self.thumbnail_grid.refresh()
+
+        self.file_count = len(self.file_index)
+
+    # Move the selected file with move_function and select the file that followed it
+    @timings.timed('classify')
+    def move_current_file(self, move_function):
+        selected_index = self.file_list.curselection()
+        if not selected_index or self.current_file is None:
+            return
+        current_index = selected_index[0]
         current_scroll_pos = self.file_list.yview()
+        old_path = self.current_file
+        next_path = None
+        if current_index + 1 < len(self.file_index):
+            next_path = self.file_index.path_at(current_index + 1)
+
+        features = self.features
+        self.playback.stop()  # Release the file before moving it
+        new_path = move_function(old_path)
+        self.apply_file_move(old_path, new_path)
+        self.update_label_index(old_path, new_path, features)
+
+        next_index = self.file_index.index_of(next_path) if next_path else None
+        if next_index is None:
+            next_index = min(current_index, self.file_list.size() - 1)
+        self.file_list.select_clear(0, tk.END)
+        if next_index >= 0:
+            self.file_list.select_set(next_index)
+            self.file_list.event_generate("<<ListboxSelect>>")
+        self.file_list.yview_moveto(current_scroll_pos[0])
+
+    # Move every file selected in the thumbnail grid with move_function and select the file after them
+    def move_selected_files(self, move_function):
+        file_paths = self.thumbnail_grid.selected_paths()
+        last_index = self.file_index.index_of(file_paths[-1])
+        next_path = None
+        if last_index + 1 < len(self.file_index):
+            next_path = self.file_index.path_at(last_index + 1)
+
+        self.playback.stop()
+        for old_path in file_paths:
+            features = self.prefetcher.cached(old_path)
+            new_path = move_function(old_path)
+            self.apply_file_move(old_path, new_path)
+            self.update_label_index(old_path, new_path, features)
+        self.update_status(f"Moving {len(file_paths)} files")
+
+        next_index = self.file_index.index_of(next_path) if next_path else None
+        if next_index is None:
+            next_index = min(last_index, self.file_list.size() - 1)
+        self.file_list.select_clear(0, tk.END)
+        if next_index >= 0:
+            self.thumbnail_grid.select_only(self.file_index.path_at(next_index))
+            self.file_list.select_set(next_index)
+            self.file_list.see(next_index)
+            self.file_list.event_generate("<<ListboxSelect>>")
 
-        self.file_list.delete(0, tk.END)
-        self.file_path_map.clear()  # Clear the mapping dictionary
-        path_names = sorted(self.file_paths)
-        for file in path_names:
-            display_path = file[self.parent_path_len:] if self.initial_directory in file else os.path.relpath(file,
-                                                                                                              config[
-                                                                                                                  'output_directory'])
-            self.file_list.insert(tk.END, display_path)
-            self.file_path_map[display_path] = file  # Map display path to actual file path
-            if config['output_directory'] in file:
-                self.file_list.itemconfig(tk.END, {'fg': 'grey'})
-        if self.file_list.size() > 0:
-            self.file_list.select_set(0)
+    # True when the label buttons should apply to several clips picked in the grid
+    def bulk_selection(self):
+        return self.grid_visible.get() and len(self.thumbnail_grid.selection) > 1
+
+    # Swap the waveform and MFCC plots for the thumbnail grid, or back
+    def toggle_thumbnail_grid(self, visible):
+        self.grid_visible.set(visible)
+        shown, hidden = ((self.thumbnail_grid, self.visualization_frame) if visible
+                         else (self.visualization_frame, self.thumbnail_grid))
+        panes = [str(pane) for pane in self.visualization_pane.panes()]
+        if str(hidden) in panes:
+            self.visualization_pane.forget(hidden)
+        if str(shown) not in panes:
+            self.visualization_pane.add(shown, before=self.classification_frame, height=400)
+        if visible:
+            self.update_idletasks()  # The grid lays out its cells from its mapped size
+            if self.current_file:
+                self.thumbnail_grid.select_only(self.current_file)
+            else:
+                self.thumbnail_grid.refresh()
+
+    # A click in the grid makes the clicked clip the current file, as in the file list
+    def on_grid_select(self, event):
+        index = self.file_index.index_of(self.thumbnail_grid.current)
+        if index is not None:
+            self.file_list.select_clear(0, tk.END)
+            self.file_list.select_set(index)
+            self.file_list.see(index)
+            self.grid_selecting = True  # Keep the selection the grid just made
+            try:
+                self.file_list.event_generate("<<ListboxSelect>>")
+            finally:
+                self.grid_selecting = False
+
+    # Pick up thumbnails finished by the render processes
+    def poll_thumbnails(self):
+        finished = self.thumbnail_cache.poll()
+        for file_path, image_path, error in finished:
+            if error is not None:
+                self.update_status(f"Error: Could not render a thumbnail of {file_path}\n{error}")
+        if finished:
+            self.thumbnail_grid.refresh()
+        self.after(50, self.poll_thumbnails)
+
+    # Pick up batches of changes found by the watcher
+    def poll_watcher(self):
+        if self.watcher is not None:
+            for batch in self.watcher.poll():
+                self.apply_file_changes(batch)
+        self.after(200, self.poll_watcher)
+
+    # Apply files added or removed outside the app, keeping the current selection
+    def apply_file_changes(self, batch):
+        if batch.overflowed:
+            self.update_status("Too many changes on disk to follow, reloading")
+            self.load_directory(self.initial_directory)
+            return
+        removed = list(batch.removed)
+        for directory in batch.removed_directories:
+            removed.extend(self.file_index.paths_under(directory))
+        if self.update_listed(batch.added, removed):
+            self.update_status(f"Files changed on disk: {len(batch.added)} added, {len(removed)} removed")
+
+    # Add and remove list entries, keeping the current selection; returns the number of changes
+    def update_listed(self, added, removed):
+        old_index = self.file_index.index_of(self.current_file) if self.current_file else None
+        if not self.file_index.update(self.listable(added), removed):
+            return 0  # Only changes the list already shows, such as moves made by this app
+        for file_path in removed:
+            self.label_index.remove(file_path)
+
+        current_index = self.file_index.index_of(self.current_file) if self.current_file else None
+        self.file_list.select_clear(0, tk.END)
+        self.thumbnail_grid.refresh()
+        self.file_count = len(self.file_index)
+        if current_index is not None:
+            self.file_list.select_set(current_index)
+        elif old_index is not None and len(self.file_index):
+            # The current file went away; select the file now in its place, without playing it
+            self.is_refreshing = True
+            self.file_list.select_set(min(old_index, len(self.file_index) - 1))
+            self.file_list.event_generate("<<ListboxSelect>>")
+            self.is_refreshing = False
+        elif old_index is not None:
+            self.clear_current_file()
+        return len(added) + len(removed)
+
+    # Show nothing selected, after the last listed file went away
+    def clear_current_file(self):
+        self.playback.stop()
+        self.current_file = None
+        self.features = None
+        if self.visualization_panel is not None:
+            self.visualization_panel.show("No file selected", None)
+
+    # Files this session lists: with a label store, input files already labelled or in
+    # another annotator's share are left out
+    def listable(self, file_paths):
+        if self.label_store is None:
+            return file_paths
+        input_prefix = self.label_store.root + os.sep
+        return [file_path for file_path in file_paths if file_path not in self.labelled_paths and
+                (not file_path.startswith(input_prefix) or self.label_store.in_share(file_path, self.sessions))]
+
+    # Record a label in the label store instead of moving the file. Returns None once
+    # recorded, so the file leaves the list, or file_path if it was refused.
+    def record_label(self, file_path, label, secondary=False):
+        try:
+            reason = self.label_store.record(file_path, label, secondary)
+        except sqlite3.Error as error:
+            reason = f"label database unavailable ({error})"
+        if reason is not None:
+            self.update_status(f"Not labelled: {file_path}\n{reason}")
+            return file_path
+        self.labelled_paths.add(file_path)
+        self.update_status(f"Labelled {label}: {file_path}\nMoved on the next commit (Ctrl+S)")
+        return None
+
+    # Keep the session alive and follow the other sessions: drop files they labelled,
+    # list retracted or failed ones again, and split the input files again when an
+    # annotator joins or leaves
+    def poll_label_store(self):
+        if self.label_store is None:
+            return
+        try:
+            self.label_store.heartbeat()
+            sessions = self.label_store.active_sessions()
+            labelled_paths = self.label_store.labelled_paths()
+        except sqlite3.Error as error:
+            self.update_status(f"Error: Label database unavailable\n{error}")
+        else:
+            if sessions != self.sessions and self.initial_directory:
+                self.sessions = sessions
+                self.labelled_paths = labelled_paths
+                names = ', '.join(annotator for session, annotator in sessions)
+                self.update_status(f"Sharing the files between {len(sessions)} sessions ({names}), reloading")
+                self.load_directory(self.initial_directory)
+            elif labelled_paths != self.labelled_paths:
+                removed = list(labelled_paths - self.labelled_paths)
+                returned = [file_path for file_path in self.labelled_paths - labelled_paths if os.path.exists(file_path)]
+                self.labelled_paths = labelled_paths
+                self.update_listed(returned, removed)
+        self.after(min(2000, self.label_store.lease_seconds * 1000 // 3), self.poll_label_store)
+
+    # Queue the moves of every file this annotator labelled since the last commit;
+    # returns how many. Destinations that already exist get a numbered name.
+    def submit_commits(self):
+        self.label_store.recover()  # Moves of a session that crashed since this one started
+        claimed = self.label_store.claim_pending()
+        destinations = []
+        for label_id, file_path, label, secondary in claimed:
+            destination = unique_path(destination_path(config, file_path, label, secondary), destinations)
+            destinations.append(destination)
+        self.label_store.set_destinations(zip(destinations, [label_id for label_id, *_ in claimed]))
+        for (label_id, file_path, label, secondary), destination in zip(claimed, destinations):
+            self.commits[self.move_pipeline.submit(file_path, destination, label)['id']] = label_id
+        return len(claimed)
+
+    def commit_labels(self):
+        if self.label_store is None:
+            return
+        try:
+            count = self.submit_commits()
+        except sqlite3.Error as error:
+            self.update_status(f"Error: Label database unavailable\n{error}")
+            return
+        self.update_status(f"Committing {count} labels" if count else "No labels to commit")
+
+    # Record the outcome of a move made by a commit; returns False for other moves
+    def finish_commit(self, record, error):
+        label_id = self.commits.pop(record['id'], None)
+        if label_id is None:
+            return False
+        self.label_store.finish_move(label_id, error is None)
+        return True
+
+    # Pick up moves finished by the move pipeline and put the list back if one failed
+    def poll_moves(self):
+        for record, error in self.move_pipeline.poll():
+            if self.finish_commit(record, error):
+                if error is not None:  # The file is listed again once the label store no longer holds it
+                    self.update_status(f"Error: Could not move {record['source']} -> {record['destination']}\n{error}")
+                continue
+            if error is None:
+                continue
+            source, destination = record['source'], record['destination']
+            if record['action'] == 'undo':
+                source, destination = destination, source
+            self.update_status(f"Error: Could not move {source} -> {destination}\n{error}")
+            if isinstance(error, FileExistsError):
+                self.update_listed([source], [])  # The file at the destination is not this move's
+                continue
+            self.apply_file_move(destination, source)
+            self.label_index.remove(destination)
+        self.after(100, self.poll_moves)
+
+    # Move the most recently classified file back to where it came from. With a label
+    # store, withdraw the latest label that has not been committed instead.
+    def undo_move(self):
+        if self.label_store is not None:
+            self.undo_label()
+            return
+        record = self.move_pipeline.undo()
+        if record is None:
+            self.update_status("Nothing to undo")
+            return
+        self.playback.stop()
+        self.apply_file_move(record['destination'], record['source'])
+        self.label_index.remove(record['destination'])
+        self.update_status(f"Undo: {record['destination']} -> {record['source']}")
+        self.select_file(record['source'])
+
+    def undo_label(self):
+        file_path = self.label_store.retract_last()
+        if file_path is None:
+            self.update_status("Nothing to undo")
+            return
+        self.labelled_paths.discard(file_path)
+        self.update_listed([file_path], [])
+        self.update_status(f"Undo: label of {file_path}")
+        self.select_file(file_path)
+
+    def select_file(self, file_path):
+        index = self.file_index.index_of(file_path)
+        if index is not None:
+            self.file_list.select_clear(0, tk.END)
+            self.file_list.select_set(index)
+            self.file_list.see(index)
             self.file_list.event_generate("<<ListboxSelect>>")
-        self.file_list.xview_moveto(1)
 
-        # Reapply the saved scroll position if the number of files is similar and more than 0
-        if self.file_list.size() > 0 and abs(self.file_list.size() - self.file_count) <= 2:
-            self.file_list.yview_moveto(current_scroll_pos[0])
+    # Keep the suggestion index in step with a move, reusing the features already on screen
+    def update_label_index(self, old_path, new_path, features):
+        if old_path == new_path:
+            return
+        self.label_index.remove(old_path)
+        if new_path is not None and features is not None and self.file_index.is_classified(new_path):
+            self.label_index.add(new_path, label_from_path(new_path, config['output_directory']),
+                                 mfcc_embedding(features.mfcc))
+
+    # Rebuild the suggestion index from the classified files in the background
+    def build_label_index(self):
+        self.label_index_stop.set()  # Stop a build started by an earlier load
+        self.label_index_stop = threading.Event()
+        self.label_index = LabelIndex()
+        threading.Thread(target=self.label_index.build, daemon=True,
+                         args=(self.file_index.classified_paths(), config['output_directory'],
+                               self.prefetcher.store, self.label_index_stop)).start()
+
+    def update_suggestions(self):
+        suggestions = []
+        if self.features is not None:
+            suggestions = self.label_index.suggest(mfcc_embedding(self.features.mfcc),
+                                                   count=len(self.suggestion_buttons),
+                                                   neighbours=config.get('suggestion_neighbours', 10),
+                                                   exclude_path=self.current_file)
+        for position, btn in enumerate(self.suggestion_buttons):
+            if position < len(suggestions):
+                label, score = suggestions[position]
+                btn.config(text=f"{position + 1}: {label} ({score:.2f})", state='normal',
+                           command=lambda l=label: self.classify(l))
+            else:
+                btn.config(text="-", state='disabled')
 
-        self.is_refreshing = False  # Reset the refreshing flag
+    def classify_suggestion(self, position):
+        if position < len(self.suggestion_buttons) and self.suggestion_buttons[position]['state'] == 'normal':
+            self.suggestion_buttons[position].invoke()
 
+    @timings.timed('select')
     def on_file_select(self, event):
         selected_index = self.file_list.curselection()
         if selected_index:
-            display_path = self.file_list.get(selected_index)
-            selected_file = self.file_path_map[display_path]
+            self.select_time = time.perf_counter()
+            selected_file = self.file_index.path_at(selected_index[0])
+            self.playback.stop()  # Interrupt playback of the previous file
+            if self.label_store is not None and not self.lease_file(selected_file):
+                return
             self.current_file = selected_file
-            self.audio, self.sr = load_audio(selected_file)
+            self.play_position = 0.0
+            if not self.grid_selecting and selected_file not in self.thumbnail_grid.selection:
+                self.thumbnail_grid.select_only(selected_file)
+            self.features = self.prefetcher.cached(selected_file)
+            if self.features is not None:
+                timings.record('select_to_features', time.perf_counter() - self.select_time)
             self.update_visualizations()
+            self.update_suggestions()
             self.update_default_button()
+            self.prefetch_around(selected_index[0])
+            # Only selections the user made play; the first row picked by a load or re-sort
+            # would otherwise open the audio device on the UI thread at startup
+            if self.auto_play_sound.get() and not self.is_refreshing:
+                self.play_audio()
+
+    # Lease the file to this session before loading it; refused while another session has it
+    def lease_file(self, file_path):
+        try:
+            reason = self.label_store.lease(file_path)
+        except sqlite3.Error as error:
+            reason = f"label database unavailable ({error})"
+        if reason is None:
+            return True
+        self.current_file = None
+        self.features = None
+        if self.visualization_panel is not None:
+            self.visualization_panel.show(f"File: {file_path} - Not loaded, {reason}", None)
+        self.update_status(f"Skipped {file_path}\n{reason}")
+        return False
+
+    # Queue the selected file and its neighbours for background decoding, nearest first
+    def prefetch_around(self, index):
+        next_count = config.get('prefetch_next', 5)
+        previous_count = config.get('prefetch_previous', 2)
+        indices = [index]
+        for offset in range(1, max(next_count, previous_count) + 1):
+            if offset <= next_count and index + offset < len(self.file_index):
+                indices.append(index + offset)
+            if offset <= previous_count and index - offset >= 0:
+                indices.append(index - offset)
+        self.prefetcher.prefetch([self.file_index.path_at(i) for i in indices])
+
+    # Pick up features finished by the prefetch workers
+    def poll_prefetch(self):
+        for file_path, features, error in self.prefetcher.poll():
+            if file_path != self.current_file or self.features is not None:
+                continue
+            if error is not None:
+                if self.visualization_panel is not None:
+                    self.visualization_panel.show(f"File: {file_path} - Could not load", None)
+                self.update_status(f"Error: Could not load {file_path}\n{error}")
+                continue
+            self.features = features
+            timings.record('select_to_features', time.perf_counter() - self.select_time)
+            self.update_visualizations()
+            self.update_suggestions()
+        for file_path, features, error in self.prefetcher.poll_windows():
+            if file_path != self.current_file or self.features is None:
+                continue
+            if error is not None:
+                self.update_status(f"Error: Could not read {file_path}\n{error}")
+                continue
+            self.features = features
+            if self.visualization_panel is not None:
+                self.visualization_panel.show_window(features)
+        self.after(20, self.poll_prefetch)
+
+    # Play from the clicked time. For long files the MFCC window follows when the new
+    # position is outside it.
+    def seek(self, seconds):
+        if self.current_file is None or self.features is None:
+            return
+        self.play_position = min(max(seconds, 0.0), self.features.duration)
+        self.visualization_panel.show_cursor(self.play_position)
+        if is_windowed(self.features):
+            start, end = mfcc_span(self.features)
+            if not start <= self.play_position < end:
+                self.prefetcher.load_window(self.current_file, self.features, self.play_position)
+        if self.auto_play_sound.get() or self.playback.is_playing():
+            self.play_audio()
 
     def play_audio(self):
         if self.current_file:
-            threaded_play_audio(self.current_file, self.audio_play_lock, self.volume.get())
+            try:
+                self.playback.play(self.current_file, start=self.play_position)
+            except Exception as error:
+                self.update_status(f"Error: Could not play {self.current_file}\n{error}")
 
     def update_visualizations(self):
-        for widget in self.waveform_frame.winfo_children():
-            widget.destroy()
-        for widget in self.mfcc_frame.winfo_children():
-            widget.destroy()
-
-        # Add header above waveforms
-        for widget in self.header_frame.winfo_children():
-            widget.destroy()
-
+        if self.visualization_panel is None:
+            return  # Still warming up; drawn once the plots exist
         file_name = os.path.basename(self.current_file)
         file_extension = os.path.splitext(file_name)[1]
         file_path = os.path.dirname(self.current_file)
         header_text = f"File: {file_path}/{file_name} ({file_extension})"
+        if self.features is None:
+            header_text += " - Loading..."
 
-        header_label = tk.Label(self.header_frame, text=header_text, font=("Helvetica", 12, "bold"))
-        header_label.pack(side=tk.TOP, fill=tk.X)
-
-        plot_waveform(self.audio, self.sr, self.waveform_frame)
-        plot_mfcc(self.audio, self.sr, self.mfcc_frame)
+        self.visualization_panel.show(header_text, self.features)
 
     def update_default_button(self):
         if self.current_file:
@@ -437,16 +1024,10 @@ class AudioClassifierApp(tk.Tk):
             self.default_classify_button.config(text=f"Accept Default: {default_label}")
 
     def classify(self, label, secondary=False):
-        if self.current_file and label:
-            current_index = self.file_list.curselection()[0]
-            current_scroll_pos = self.file_list.yview()
-            classify_audio(self.current_file, label, secondary)
-            next_index = min(current_index + 1, self.file_list.size() - 1)
-            self.load_directory(self.initial_directory)
-            self.file_list.select_clear(0, tk.END)
-            self.file_list.select_set(next_index)
-            self.file_list.event_generate("<<ListboxSelect>>")
-            self.file_list.yview_moveto(current_scroll_pos[0])
+        if self.bulk_selection() and label:
+            self.move_selected_files(lambda file_path: classify_audio(file_path, label, secondary, ask=False))
+        elif self.current_file and label:
+            self.move_current_file(lambda file_path: classify_audio(file_path, label, secondary))
 
     def classify_default(self):
         if self.current_file:
@@ -463,6 +1044,7 @@ class AudioClassifierApp(tk.Tk):
                 if next_index < self.file_list.size():
                     self.file_list.select_clear(0, tk.END)
                     self.file_list.select_set(next_index)
+                    self.file_list.see(next_index)
                     self.file_list.event_generate("<<ListboxSelect>>")
         elif action == 'previous':
             current_index = self.file_list.curselection()
@@ -471,27 +1053,35 @@ class AudioClassifierApp(tk.Tk):
                 if prev_index >= 0:
                     self.file_list.select_clear(0, tk.END)
                     self.file_list.select_set(prev_index)
+                    self.file_list.see(prev_index)
                     self.file_list.event_generate("<<ListboxSelect>>")
         elif action == 'accept_default':
             self.classify_default()
         elif action == 'unknown':
-            if self.current_file:
-                current_index = self.file_list.curselection()[0]
-                current_scroll_pos = self.file_list.yview()
-                unknown_path = os.path.join(config['output_directory'], 'unknown')
-                os.makedirs(unknown_path, exist_ok=True)
-                shutil.move(self.current_file, os.path.join(unknown_path, os.path.basename(self.current_file)))
-                next_index = min(current_index + 1, self.file_list.size() - 1)
-                self.load_directory(self.initial_directory)
-                self.file_list.select_clear(0, tk.END)
-                self.file_list.select_set(next_index)
-                self.file_list.event_generate("<<ListboxSelect>>")
-                self.file_list.yview_moveto(current_scroll_pos[0])
-
+            if self.bulk_selection():
+                self.move_selected_files(move_to_unknown)
+            elif self.current_file:
+                self.move_current_file(move_to_unknown)
+
+    def load_settings(self):
+        try:
+            with open(self.settings_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}  # Not saved yet, or damaged: fall back to config.yaml
+
+    # Save the setting per annotator in the label store, or in the settings file. The file
+    # is replaced in one step so another session never reads it half written.
     def toggle_auto_play_sound(self):
-        config['auto_play_sound'] = self.auto_play_sound.get()
-        with open(config_file_path, 'w') as file:
-            yaml.safe_dump(config, file)
+        if self.label_store is not None:
+            self.label_store.set_setting('auto_play_sound', self.auto_play_sound.get())
+            return
+        self.settings['auto_play_sound'] = self.auto_play_sound.get()
+        os.makedirs(os.path.dirname(self.settings_path) or '.', exist_ok=True)
+        temporary_path = self.settings_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self.settings, file)
+        os.replace(temporary_path, self.settings_path)
 
     def update_status(self, message):
         self.status_line.config(state='normal')
@@ -510,3 +1100,15 @@ class AudioClassifierApp(tk.Tk):
 if __name__ == "__main__":
     app = AudioClassifierApp()
     app.mainloop()
+    if app.label_store is not None:
+        app.submit_commits()  # Labels of this session are moved on exit
+    app.move_pipeline.close()  # Let queued moves finish
+    if app.label_store is not None:
+        for record, error in app.move_pipeline.poll():
+            app.finish_commit(record, error)
+        app.label_store.close()
+    app.prefetcher.shutdown()
+    app.thumbnail_cache.shutdown()
+    if app.watcher is not None:
+        app.watcher.stop()
+    app.playback.close()
@@ -0,0 +1,105 @@
+import collections
+import os
+import numpy as np
+from audio_window import WINDOW_SECONDS, audio_info, read_window, stream_envelope
+from timing import timings
+
+ENVELOPE_MAX_BINS = 16384  # Upper bound on the resolution of the stored min/max waveform envelope
+ENVELOPE_MIN_BINS = 64  # Coarsest level kept in an envelope pyramid
+N_MFCC = 13
+HOP_LENGTH = 512  # librosa's default MFCC hop
+
+# Everything the visualizations need for one clip, without keeping the decoded audio around.
+# The envelope always covers the whole clip; for long files the MFCC only covers the window
+# starting at mfcc_start seconds.
+ClipFeatures = collections.namedtuple('ClipFeatures',
+                                      ['sr', 'duration', 'envelope_min', 'envelope_max', 'mfcc', 'mfcc_start'],
+                                      defaults=(0.0,))
+
+
+# Function to load audio file
+@timings.timed('load_audio')
+def load_audio(file_path):
+    import librosa  # Imported on first use; it takes seconds and the window should not wait for it
+    audio, sr = librosa.load(file_path, sr=None)
+    return audio, sr
+
+
+# Function to build a cache key that changes whenever the file on disk changes
+def file_key(file_path):
+    stat = os.stat(file_path)
+    return file_path, stat.st_mtime_ns, stat.st_size
+
+
+# Function to reduce audio to min/max peaks per bin, using the smallest power-of-two
+# bin size that keeps the envelope within max_bins
+def peak_envelope(audio, max_bins=ENVELOPE_MAX_BINS):
+    if len(audio) == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    samples_per_bin = 1
+    while len(audio) > samples_per_bin * max_bins:
+        samples_per_bin *= 2
+    padded_length = samples_per_bin * int(np.ceil(len(audio) / samples_per_bin))
+    padded = np.pad(audio, (0, padded_length - len(audio)), mode='edge')
+    frames = padded.reshape(-1, samples_per_bin)
+    return frames.min(axis=1).astype(np.float32), frames.max(axis=1).astype(np.float32)
+
+
+# Function to build min/max envelopes for every power-of-two decimation of the finest level.
+# Level k+1 halves the resolution of level k, down to about min_bins bins.
+def envelope_pyramid(envelope_min, envelope_max, min_bins=ENVELOPE_MIN_BINS):
+    levels = [(envelope_min, envelope_max)]
+    while len(levels[-1][1]) > min_bins:
+        level_min, level_max = levels[-1]
+        if len(level_max) % 2:
+            level_min = np.append(level_min, level_min[-1])
+            level_max = np.append(level_max, level_max[-1])
+        levels.append((level_min.reshape(-1, 2).min(axis=1), level_max.reshape(-1, 2).max(axis=1)))
+    return levels
+
+
+@timings.timed('mfcc')
+def audio_mfcc(audio, sr, n_mfcc=N_MFCC):
+    import librosa
+    return librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=n_mfcc, hop_length=HOP_LENGTH).astype(np.float32)
+
+
+# Function to decode a file and compute the features used by the waveform and MFCC plots.
+# Files longer than WINDOW_SECONDS are never decoded whole: the envelope is streamed block
+# by block and the MFCC covers the first window only (see compute_window_features).
+def compute_features(file_path, n_mfcc=N_MFCC):
+    info = audio_info(file_path)
+    if info is not None and info[1] > WINDOW_SECONDS * info[0]:
+        sr, frames = info
+        with timings.measure('load_audio'):
+            envelope_min, envelope_max = stream_envelope(file_path, ENVELOPE_MAX_BINS)
+            audio, _ = read_window(file_path, 0, WINDOW_SECONDS)
+        return ClipFeatures(sr, frames / sr, envelope_min, envelope_max, audio_mfcc(audio, sr, n_mfcc))
+
+    audio, sr = load_audio(file_path)
+    envelope_min, envelope_max = peak_envelope(audio)
+    return ClipFeatures(sr, len(audio) / sr, envelope_min, envelope_max, audio_mfcc(audio, sr, n_mfcc))
+
+
+# Function to recompute the MFCC of a long file for the window starting at start seconds,
+# keeping the whole-file envelope of features
+def compute_window_features(file_path, features, start, n_mfcc=N_MFCC):
+    start = min(max(start, 0.0), max(features.duration - WINDOW_SECONDS, 0.0))
+    with timings.measure('load_window'):
+        audio, sr = read_window(file_path, start, WINDOW_SECONDS)
+    return features._replace(mfcc=audio_mfcc(audio, sr, n_mfcc), mfcc_start=start)
+
+
+# Function to tell whether the MFCC of features covers only part of the clip
+def is_windowed(features):
+    return features.duration > WINDOW_SECONDS
+
+
+# Function to get the (start, end) seconds covered by the MFCC of features
+def mfcc_span(features):
+    return features.mfcc_start, min(features.mfcc_start + features.mfcc.shape[1] * HOP_LENGTH / features.sr,
+                                    features.duration)
+
+
+def features_nbytes(features):
+    return features.envelope_min.nbytes + features.envelope_max.nbytes + features.mfcc.nbytes
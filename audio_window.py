@@ -0,0 +1,50 @@
+import numpy as np
+import soundfile as sf
+
+WINDOW_SECONDS = 60.0  # Files longer than this are read window by window instead of decoded whole
+BLOCK_FRAMES = 1 << 20  # Frames per read while streaming the overview envelope (about 4 MB per channel)
+
+
+# Function to get (sample rate, frame count) of a file soundfile can seek in, or None if it cannot open it
+def audio_info(file_path):
+    try:
+        info = sf.info(file_path)
+    except RuntimeError:  # Also raised for formats this libsndfile build cannot decode
+        return None
+    return info.samplerate, info.frames
+
+
+# Function to mix a (frames, channels) block down to mono, as librosa.load does
+def to_mono(block):
+    return block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+
+
+# Function to read start..start+duration seconds of a file as mono float32, seeking
+# straight to the first frame so memory depends on the window, not the file
+def read_window(file_path, start, duration):
+    with sf.SoundFile(file_path) as sound_file:
+        first = min(max(int(start * sound_file.samplerate), 0), sound_file.frames)
+        sound_file.seek(first)
+        block = sound_file.read(int(duration * sound_file.samplerate), dtype='float32', always_2d=True)
+        return to_mono(block), sound_file.samplerate
+
+
+# Function to compute the min/max peak envelope of a whole file in fixed-size blocks.
+# Gives the same result as peak_envelope() on the decoded file, with memory bounded
+# by BLOCK_FRAMES however long the file is.
+def stream_envelope(file_path, max_bins):
+    with sf.SoundFile(file_path) as sound_file:
+        samples_per_bin = 1
+        while sound_file.frames > samples_per_bin * max_bins:
+            samples_per_bin *= 2
+        block_frames = max(BLOCK_FRAMES // samples_per_bin, 1) * samples_per_bin  # Whole bins per block
+        minima, maxima = [], []
+        for block in sound_file.blocks(blocksize=block_frames, dtype='float32', always_2d=True):
+            audio = to_mono(block)
+            padded_length = samples_per_bin * int(np.ceil(len(audio) / samples_per_bin))
+            frames = np.pad(audio, (0, padded_length - len(audio)), mode='edge').reshape(-1, samples_per_bin)
+            minima.append(frames.min(axis=1))
+            maxima.append(frames.max(axis=1))
+    if not maxima:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    return np.concatenate(minima).astype(np.float32), np.concatenate(maxima).astype(np.float32)
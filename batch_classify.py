@@ -0,0 +1,131 @@
+# Headless bulk classification. Applies a CSV or JSONL manifest of
+# (path, label, secondary) decisions with the same destination rules as the GUI.
+#
+#   python batch_classify.py decisions.csv --conflict rename --dry-run
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from classification import CONFLICT_POLICIES, config_file_path, load_config, destination_path, move_file, unique_path
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y', 'secondary')
+
+
+# Function to read manifest rows as (path, label, secondary) tuples
+def read_manifest(manifest_path):
+    with open(manifest_path, 'r', newline='', encoding='utf-8') as file:
+        if manifest_path.lower().endswith(('.jsonl', '.json')):
+            records = (json.loads(line) for line in file if line.strip())
+        else:
+            records = csv.DictReader(file)
+        for record in records:
+            secondary = record.get('secondary') or False
+            if isinstance(secondary, str):
+                secondary = secondary.strip().lower() in TRUE_VALUES
+            yield record['path'], record['label'], bool(secondary)
+
+
+# Function to decide what happens to every row before anything is moved.
+# Planning runs in manifest order so conflicts resolve the same way on every run,
+# including rows of the same manifest that target the same destination.
+def plan_moves(rows, config, conflict, base_directory):
+    plan = []
+    claimed = set()
+    for file_path, label, secondary in rows:
+        if not os.path.isabs(file_path):
+            file_path = os.path.join(base_directory, file_path)
+        new_file_path = destination_path(config, file_path, label, secondary)
+        if not os.path.exists(file_path):
+            plan.append(('missing', file_path, new_file_path))
+            continue
+        if os.path.abspath(file_path) == os.path.abspath(new_file_path):
+            claimed.add(new_file_path)  # Already in place; a later row must not replace it
+            plan.append(('unchanged', file_path, new_file_path))
+            continue
+        action = 'move'
+        if new_file_path in claimed:
+            # Never overwrite a file moved earlier in the same run
+            if conflict == 'rename':
+                new_file_path = unique_path(new_file_path, claimed)
+            else:
+                action = 'skip'
+        elif os.path.exists(new_file_path):
+            if conflict == 'overwrite':
+                action = 'overwrite'
+            elif conflict == 'rename':
+                new_file_path = unique_path(new_file_path, claimed)
+            else:
+                action = 'skip'
+        if action != 'skip':
+            claimed.add(new_file_path)
+        plan.append((action, file_path, new_file_path))
+    return plan
+
+
+def apply_move(action, file_path, new_file_path):
+    size = os.path.getsize(file_path)
+    move_file(file_path, new_file_path, overwrite=(action == 'overwrite'))
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply a manifest of classification decisions without the GUI.")
+    parser.add_argument('manifest', help="CSV with a path,label[,secondary] header, or JSONL with the same keys")
+    parser.add_argument('--config', default=config_file_path, help="Configuration file (default: config.yaml)")
+    parser.add_argument('--conflict', choices=CONFLICT_POLICIES, default='skip',
+                        help="What to do when the destination file already exists (default: skip)")
+    parser.add_argument('--dry-run', action='store_true', help="Print what would happen without moving anything")
+    parser.add_argument('--workers', type=int, default=8, help="Number of parallel moves (default: 8)")
+    parser.add_argument('--base-directory', help="Directory relative manifest paths are resolved against "
+                                                 "(default: input_directory from the configuration)")
+    parser.add_argument('--verbose', action='store_true', help="Print every planned or applied move")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    base_directory = args.base_directory or config.get('input_directory') or '.'
+
+    start_time = time.perf_counter()
+    plan = plan_moves(read_manifest(args.manifest), config, args.conflict, base_directory)
+    plan_seconds = time.perf_counter() - start_time
+
+    counts = {'move': 0, 'overwrite': 0, 'skip': 0, 'unchanged': 0, 'missing': 0, 'failed': 0}
+    for action, file_path, new_file_path in plan:
+        if action in ('skip', 'unchanged', 'missing'):
+            counts[action] += 1
+        if args.verbose or (args.dry_run and action != 'missing'):
+            print(f"{action}: {file_path} -> {new_file_path}")
+
+    moves = [entry for entry in plan if entry[0] in ('move', 'overwrite')]
+    moved_bytes = 0
+    move_start_time = time.perf_counter()
+    if not args.dry_run:
+        with ThreadPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            futures = [(entry, executor.submit(apply_move, *entry)) for entry in moves]
+            for (action, file_path, new_file_path), future in futures:
+                try:
+                    moved_bytes += future.result()
+                    counts[action] += 1
+                except OSError as error:
+                    counts['failed'] += 1
+                    print(f"Error: {file_path} -> {new_file_path}: {error}", file=sys.stderr)
+    else:
+        for action, _, _ in moves:
+            counts[action] += 1
+    move_seconds = time.perf_counter() - move_start_time
+
+    done = counts['move'] + counts['overwrite']
+    prefix = "Would apply" if args.dry_run else "Applied"
+    print(f"{prefix} {len(plan)} decisions: {counts['move']} moved, {counts['overwrite']} overwritten, "
+          f"{counts['skip']} skipped, {counts['unchanged']} unchanged, {counts['missing']} missing, {counts['failed']} failed")
+    print(f"Planning: {plan_seconds:.2f} s ({len(plan) / max(plan_seconds, 1e-9):.0f} rows/s)")
+    if not args.dry_run:
+        print(f"Moving: {move_seconds:.2f} s ({done / max(move_seconds, 1e-9):.0f} files/s, "
+              f"{moved_bytes / 1048576 / max(move_seconds, 1e-9):.1f} MB/s)")
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# Headless benchmark of the annotation hot path on a generated dataset: scan, index and
+# sort, decode, MFCC, figure update and draw, playback start and the classification move.
+# Run from the repository root: python -m benchmarks.annotation_pipeline --clips 500 --seconds 5
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import soundfile as sf
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import scanner
+from audio_features import compute_features
+from classification import move_file
+from file_index import FileIndex
+from scanner import DirectoryScanner
+from timing import timings
+from visualization import WaveformPlot, MfccPlot
+
+
+# Function to write clips of tones, noise bursts and silence into label folders
+def generate_dataset(root, clip_count, seconds, sample_rate, labels=10):
+    rng = np.random.default_rng(0)
+    times = np.arange(int(seconds * sample_rate)) / sample_rate
+    for clip_index in range(clip_count):
+        directory = os.path.join(root, f"label_{clip_index % labels:02d}")
+        os.makedirs(directory, exist_ok=True)
+        tone = np.sin(2 * np.pi * rng.uniform(100, 4000) * times) * rng.uniform(0.05, 0.5)
+        burst = rng.standard_normal(len(times)) * (rng.uniform(size=len(times)) < 0.01)
+        sf.write(os.path.join(directory, f"clip_{clip_index:06d}.wav"), (tone + burst * 0.2).astype(np.float32),
+                 sample_rate, subtype='PCM_16')
+
+
+# Function to open and stop a playback stream per clip, if PyAudio and an output device are available
+def benchmark_playback(file_paths):
+    try:
+        from playback import PlaybackEngine
+        engine = PlaybackEngine()
+    except Exception as error:
+        print(f"Playback skipped: {error}")
+        return
+    try:
+        for file_path in file_paths:
+            engine.play(file_path)
+            engine.stop()
+    except Exception as error:
+        print(f"Playback stopped early: {error}")
+    finally:
+        engine.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotation hot path benchmark")
+    parser.add_argument('--clips', type=int, default=500, help="Number of clips to generate")
+    parser.add_argument('--seconds', type=float, default=5.0, help="Length of each clip")
+    parser.add_argument('--sample-rate', type=int, default=48000)
+    parser.add_argument('--directory', help="Benchmark an existing tree instead of generating one (not modified)")
+    parser.add_argument('--skip-playback', action='store_true')
+    args = parser.parse_args()
+
+    scanner.SETTLE_NS = 0  # The generated tree is brand new; trust its mtimes right away
+    work_directory = tempfile.mkdtemp(prefix='annotation_benchmark_')
+    try:
+        input_directory = args.directory
+        if input_directory is None:
+            input_directory = os.path.join(work_directory, 'input')
+            start_time = time.perf_counter()
+            generate_dataset(input_directory, args.clips, args.seconds, args.sample_rate)
+            print(f"Generated {args.clips} clips of {args.seconds} s at {args.sample_rate} Hz "
+                  f"in {time.perf_counter() - start_time:.1f} s")
+        output_directory = os.path.join(work_directory, 'output')
+
+        directory_scanner = DirectoryScanner()
+        file_paths = directory_scanner.scan(input_directory)  # Cold: every directory is listed
+        directory_scanner.scan(input_directory)  # Warm: only stats
+        file_index = FileIndex(input_directory, output_directory)
+        file_index.load(file_paths)
+        for sort_mode in ('path', 'name'):
+            with timings.measure('organize'):
+                file_index.resort(sort_mode)
+                for index in range(min(len(file_index), 50)):  # One screen of rows
+                    file_index.row(index)
+
+        plots = [WaveformPlot(), MfccPlot()]
+        canvases = [FigureCanvasAgg(plot.figure) for plot in plots]
+        ordered_paths = [file_index.path_at(index) for index in range(len(file_index))]
+        for file_path in ordered_paths:
+            features = compute_features(file_path)
+            with timings.measure('plot_update'):
+                for plot in plots:
+                    plot.update(features)
+            with timings.measure('plot_draw'):
+                for canvas in canvases:
+                    canvas.draw()
+
+        if not args.skip_playback:
+            benchmark_playback(ordered_paths)
+
+        if args.directory is None:
+            for file_path in ordered_paths:
+                label = os.path.basename(os.path.dirname(file_path))
+                move_file(file_path, os.path.join(output_directory, label, os.path.basename(file_path)))
+
+        print(f"Files: {len(file_paths)}")
+        print(timings.summary())
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# Startup scan benchmark: os.walk versus DirectoryScanner with a cold and a warm manifest.
+# Run from the repository root: python -m benchmarks.scan_startup --files 500000
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import scanner
+from file_index import AUDIO_EXTENSIONS
+from scanner import DirectoryScanner
+
+
+# Function to create an empty-file tree of label/session directories
+def generate_tree(root, file_count, files_per_directory):
+    directory_count = max(file_count // files_per_directory, 1)
+    for directory_index in range(directory_count):
+        directory = os.path.join(root, f"label_{directory_index % 40:02d}", f"session_{directory_index:05d}")
+        os.makedirs(directory, exist_ok=True)
+        for file_index in range(min(files_per_directory, file_count - directory_index * files_per_directory)):
+            open(os.path.join(directory, f"clip_{file_index:04d}.wav"), 'wb').close()
+
+
+def walk_files(root):
+    return [os.path.join(directory, name) for directory, _, names in os.walk(root)
+            for name in names if name.endswith(AUDIO_EXTENSIONS)]
+
+
+# Function to load the manifest and scan, as a restart of the application would
+def startup_scan(manifest_path, root, workers):
+    directory_scanner = DirectoryScanner(manifest_path, workers=workers)
+    return directory_scanner, directory_scanner.scan(root)
+
+
+def timed(function, *args):
+    start_time = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start_time, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Directory scan startup benchmark")
+    parser.add_argument('--files', type=int, default=500000)
+    parser.add_argument('--files-per-directory', type=int, default=250)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--directory', help="Benchmark an existing tree instead of generating one")
+    args = parser.parse_args()
+
+    scanner.SETTLE_NS = 0  # The generated tree is brand new; trust its mtimes right away
+    work_directory = tempfile.mkdtemp(prefix='scan_benchmark_')
+    try:
+        root = args.directory
+        if root is None:
+            root = os.path.join(work_directory, 'tree')
+            seconds, _ = timed(generate_tree, root, args.files, args.files_per_directory)
+            print(f"Generated {args.files} files in {seconds:.1f} s")
+        manifest_path = os.path.join(work_directory, 'scan_manifest.json')
+
+        seconds, files = timed(walk_files, root)
+        print(f"os.walk:                {seconds:8.3f} s  {len(files)} files")
+
+        seconds, (cold_scanner, files) = timed(startup_scan, manifest_path, root, args.workers)
+        cold_scanner.save()
+        print(f"scanner, cold manifest: {seconds:8.3f} s  {len(files)} files, "
+              f"{cold_scanner.listed_count} directories listed")
+
+        seconds, (warm_scanner, files) = timed(startup_scan, manifest_path, root, args.workers)
+        print(f"scanner, warm manifest: {seconds:8.3f} s  {len(files)} files, "
+              f"{warm_scanner.listed_count} directories listed")
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# Startup benchmark: what has to load before the window can show, versus the audio and
+# plotting stacks that are now warmed up in the background once it is on screen.
+# Each measurement runs in a fresh interpreter, as a real start does.
+# Run from the repository root: python -m benchmarks.startup --runs 5
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+STAGES = [
+    ("interpreter", "pass"),
+    ("window path (import app)", "import app"),
+    ("background warm-up", "import numpy as np, librosa, visualization; "
+                           "librosa.feature.mfcc(y=np.zeros(4096, dtype=np.float32), sr=22050)"),
+    ("eager (all of the above)", "import app, numpy as np, librosa, visualization; "
+                                 "librosa.feature.mfcc(y=np.zeros(4096, dtype=np.float32), sr=22050)"),
+]
+
+
+def run_seconds(code):
+    start_time = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], check=True)
+    return time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Application startup benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--pyaudio', action='store_true', help="Also time importing PyAudio and opening PortAudio")
+    args = parser.parse_args()
+
+    stages = list(STAGES)
+    if args.pyaudio:
+        stages.append(("audio device", "import pyaudio; pyaudio.PyAudio().terminate()"))
+
+    run_seconds("import app, librosa, visualization")  # Fill the OS file cache so every stage starts warm
+    for name, code in stages:
+        seconds = [run_seconds(code) for _ in range(args.runs)]
+        print(f"{name:<28} median {statistics.median(seconds):6.2f} s  min {min(seconds):6.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
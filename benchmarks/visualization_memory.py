@@ -0,0 +1,60 @@
+# Steady-state memory benchmark for the persistent visualization figures.
+# Run from the repository root: python -m benchmarks.visualization_memory
+import argparse
+import gc
+import sys
+import tracemalloc
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from audio_features import ClipFeatures, ENVELOPE_MAX_BINS, N_MFCC
+from visualization import WaveformPlot, MfccPlot
+
+
+# Function to build fake features for clips of varying length
+def synthetic_features(rng, count, sr=48000, hop_length=512):
+    clips = []
+    for _ in range(count):
+        duration = float(rng.uniform(0.5, 60.0))
+        envelope_max = np.abs(rng.standard_normal(ENVELOPE_MAX_BINS)).astype(np.float32)
+        mfcc = rng.standard_normal((N_MFCC, int(duration * sr / hop_length) + 1)).astype(np.float32)
+        clips.append(ClipFeatures(sr, duration, -envelope_max, envelope_max, mfcc))
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Visualization memory benchmark")
+    parser.add_argument('--navigations', type=int, default=10000)
+    parser.add_argument('--warmup', type=int, default=500)
+    parser.add_argument('--max-growth-kb', type=float, default=1024)
+    args = parser.parse_args()
+
+    clips = synthetic_features(np.random.default_rng(0), 64)
+    plots = [WaveformPlot(), MfccPlot()]
+    canvases = [FigureCanvasAgg(plot.figure) for plot in plots]
+
+    tracemalloc.start()
+    baseline = None
+    for navigation in range(args.navigations):
+        if navigation == args.warmup:
+            gc.collect()
+            baseline = tracemalloc.get_traced_memory()[0]
+        features = clips[navigation % len(clips)]
+        for plot, canvas in zip(plots, canvases):
+            plot.update(features)
+            canvas.draw()
+    gc.collect()
+    final = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    if baseline is None:
+        print("Not enough navigations to get past the warmup")
+        return 1
+    growth_kb = (final - baseline) / 1024
+    print(f"Navigations: {args.navigations} (warmup {args.warmup})")
+    print(f"Traced memory after warmup: {baseline / 1024:.1f} KB, at end: {final / 1024:.1f} KB")
+    print(f"Growth: {growth_kb:.1f} KB")
+    return 0 if growth_kb <= args.max_growth_kb else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+import shutil
+import yaml
+from timing import timings
+
+config_file_path = 'config.yaml'
+
+CONFLICT_POLICIES = ('skip', 'overwrite', 'rename')
+
+
+# Function to load the application configuration
+def load_config(path=config_file_path):
+    with open(path, 'r') as file:
+        return yaml.safe_load(file)
+
+
+# Function to work out where a file classified with label is moved to
+def destination_path(config, file_path, label, secondary=False):
+    output_path = config['secondary_output_directory'] if secondary else config['output_directory']
+    return os.path.join(output_path, label, os.path.basename(file_path))
+
+
+# Function to find a free name next to path by appending _1, _2, ... to the file name
+def unique_path(path, taken=()):
+    if not os.path.exists(path) and path not in taken:
+        return path
+    root, extension = os.path.splitext(path)
+    counter = 1
+    while os.path.exists(f"{root}_{counter}{extension}") or f"{root}_{counter}{extension}" in taken:
+        counter += 1
+    return f"{root}_{counter}{extension}"
+
+
+# Function to move a classified file into place. If the destination exists it is
+# replaced when overwrite is set, otherwise the caller must resolve the conflict first.
+@timings.timed('move_file')
+def move_file(file_path, new_file_path, overwrite=False):
+    if os.path.abspath(file_path) == os.path.abspath(new_file_path):
+        return new_file_path  # Already in place; removing the "existing" file would delete it
+    os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
+    if overwrite and os.path.exists(new_file_path):
+        os.remove(new_file_path)
+    shutil.move(file_path, new_file_path)
+    return new_file_path
@@ -0,0 +1,299 @@
+# Duplicate and near-duplicate clip detection across the input and output trees.
+# Exact copies are found by size, then SHA-1. Re-encoded or renamed copies are found
+# by comparing MinHash signatures of banded spectral peak fingerprints, bucketed with
+# locality-sensitive hashing so the pass does not compare every pair of clips.
+# Results are kept in <cache_directory>/dedup.sqlite; re-runs only fingerprint new or
+# changed files.
+#
+#   python dedup.py --report duplicates.json
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import librosa
+import numpy as np
+from classification import config_file_path, load_config
+from scanner import DirectoryScanner
+
+FINGERPRINT_SR = 8000
+FINGERPRINT_N_FFT = 1024
+FINGERPRINT_HOP = 256
+# Frequency bands (STFT bin ranges) searched for spectral peaks
+FINGERPRINT_BANDS = ((4, 12), (12, 24), (24, 48), (48, 96), (96, 192), (192, 384))
+FINGERPRINT_DELTAS = (1, 2)  # Frame distances between paired peaks
+SILENCE_DB = -50  # Peaks this far below the clip's loudest bin are ignored
+SALIENCE_DB = 10  # Peaks must stand this far above the band median
+
+MINHASH_SIZE = 64
+LSH_BANDS = 16  # MINHASH_SIZE / LSH_BANDS rows per band
+PREFIX_BYTES = 65536
+
+_rng = np.random.default_rng(20240625)  # Fixed, so signatures stay comparable across runs
+MINHASH_A = _rng.integers(1, 2 ** 63, MINHASH_SIZE, dtype=np.uint64) | np.uint64(1)
+MINHASH_B = _rng.integers(0, 2 ** 63, MINHASH_SIZE, dtype=np.uint64)
+
+
+# Function to turn a clip into a set of peak-pair hashes. For every band, the strongest
+# bin of a frame is paired with the strongest bin a few frames later. Each band
+# contributes on its own, so noise in one band does not spoil the hashes of the others.
+def fingerprint_hashes(audio):
+    spectrum_db = librosa.amplitude_to_db(
+        np.abs(librosa.stft(audio, n_fft=FINGERPRINT_N_FFT, hop_length=FINGERPRINT_HOP)), ref=np.max)
+    hashes = []
+    for band, (low, high) in enumerate(FINGERPRINT_BANDS):
+        band_db = spectrum_db[low:high]
+        level = band_db.max(axis=0)
+        salient = (level > SILENCE_DB) & (level - np.median(band_db, axis=0) > SALIENCE_DB)
+        peaks = (band_db.argmax(axis=0) // 2).astype(np.uint64)  # Coarse bins survive re-encoding
+        for delta in FINGERPRINT_DELTAS:
+            paired = salient[:-delta] & salient[delta:]
+            band_hashes = ((np.uint64(band) << np.uint64(24)) | (np.uint64(delta) << np.uint64(16))
+                           | (peaks[:-delta] << np.uint64(8)) | peaks[delta:])
+            hashes.append(band_hashes[paired])
+    return np.unique(np.concatenate(hashes)) if hashes else np.zeros(0, dtype=np.uint64)
+
+
+# Function to reduce a set of hashes to a MinHash signature, or None for an empty set
+def minhash(hashes):
+    if len(hashes) == 0:
+        return None
+    with np.errstate(over='ignore'):
+        permuted = hashes[None, :] * MINHASH_A[:, None] + MINHASH_B[:, None]
+    return (permuted.min(axis=1) >> np.uint64(32)).astype(np.uint32)
+
+
+# Function run in the process pool: decode a clip and compute its signature
+def fingerprint_file(file_path):
+    try:
+        audio, _ = librosa.load(file_path, sr=FINGERPRINT_SR, mono=True)
+        signature = minhash(fingerprint_hashes(audio))
+        return file_path, None if signature is None else signature.tobytes(), None
+    except Exception as error:
+        return file_path, None, str(error)
+
+
+# Function to hash a file, either just its first PREFIX_BYTES or all of it
+def file_sha1(file_path, prefix_only=False):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        if prefix_only:
+            digest.update(file.read(PREFIX_BYTES))
+        else:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+# Persisted per-file results (prefix hash, full hash, fingerprint), valid while size and
+# mtime are unchanged; sync drops them for changed files
+class DedupIndex:
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha1 TEXT,
+                fingerprinted INTEGER NOT NULL DEFAULT 0,
+                minhash BLOB,
+                prefix_sha1 TEXT
+            )''')
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(files)')}
+        if 'prefix_sha1' not in columns:  # Index written before prefix hashes were kept
+            self.connection.execute('ALTER TABLE files ADD COLUMN prefix_sha1 TEXT')
+
+    # Bring the table in line with the files on disk; returns {path: (size, mtime_ns)}
+    def sync(self, file_paths):
+        stats = {}
+        for file_path in file_paths:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            stats[file_path] = (stat.st_size, stat.st_mtime_ns)
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                 self.connection.execute('SELECT path, size, mtime_ns FROM files')}
+        with self.connection:
+            self.connection.executemany('DELETE FROM files WHERE path = ?',
+                                        [(path,) for path in known if path not in stats])
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns) VALUES (?, ?, ?)',
+                [(path, size, mtime_ns) for path, (size, mtime_ns) in stats.items() if known.get(path) != (size, mtime_ns)])
+        return stats
+
+    def missing_sha1(self, file_paths):
+        have = {path for path, in self.connection.execute('SELECT path FROM files WHERE sha1 IS NOT NULL')}
+        return [path for path in file_paths if path not in have]
+
+    def set_sha1(self, results):
+        with self.connection:
+            self.connection.executemany('UPDATE files SET sha1 = ? WHERE path = ?',
+                                        [(sha1, path) for path, sha1 in results])
+
+    def prefix_sha1s(self):
+        return dict(self.connection.execute('SELECT path, prefix_sha1 FROM files WHERE prefix_sha1 IS NOT NULL'))
+
+    def set_prefix_sha1(self, results):
+        with self.connection:
+            self.connection.executemany('UPDATE files SET prefix_sha1 = ? WHERE path = ?',
+                                        [(prefix, path) for path, prefix in results])
+
+    def sha1s(self):
+        return dict(self.connection.execute('SELECT path, sha1 FROM files WHERE sha1 IS NOT NULL'))
+
+    def unfingerprinted(self):
+        return [path for path, in self.connection.execute('SELECT path FROM files WHERE fingerprinted = 0')]
+
+    def set_minhashes(self, results):
+        with self.connection:
+            self.connection.executemany('UPDATE files SET fingerprinted = 1, minhash = ? WHERE path = ?',
+                                        [(signature, path) for path, signature in results])
+
+    # Returns the fingerprinted paths and their signatures as one (files, MINHASH_SIZE) matrix
+    def minhashes(self):
+        paths = []
+        blobs = []
+        for path, signature in self.connection.execute('SELECT path, minhash FROM files WHERE minhash IS NOT NULL'):
+            paths.append(path)
+            blobs.append(signature)
+        return paths, np.frombuffer(b''.join(blobs), dtype=np.uint32).reshape(-1, MINHASH_SIZE)
+
+
+# Function to group files by identical content: size first, then prefix hash, then full hash
+def exact_duplicates(index, stats, workers):
+    by_size = defaultdict(list)
+    for file_path, (size, _) in stats.items():
+        by_size[size].append(file_path)
+    candidates = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        prefixes = index.prefix_sha1s()  # Kept until sync sees the file change
+        to_prefix = [path for path in candidates if path not in prefixes]
+        computed = list(zip(to_prefix, executor.map(lambda p: file_sha1(p, prefix_only=True), to_prefix)))
+        index.set_prefix_sha1(computed)
+        prefixes.update(computed)
+        by_prefix = defaultdict(list)
+        for file_path in candidates:
+            by_prefix[(stats[file_path][0], prefixes[file_path])].append(file_path)
+        to_hash = index.missing_sha1([path for paths in by_prefix.values() if len(paths) > 1 for path in paths])
+        index.set_sha1(zip(to_hash, executor.map(file_sha1, to_hash)))
+
+    sha1s = index.sha1s()
+    by_hash = defaultdict(list)
+    for paths in by_prefix.values():
+        if len(paths) > 1:
+            for file_path in paths:
+                by_hash[sha1s[file_path]].append(file_path)
+    return sorted(sorted(paths) for paths in by_hash.values() if len(paths) > 1)
+
+
+# Function to find groups of clips whose estimated fingerprint similarity reaches threshold.
+# For every LSH band, clips sharing that slice of their signature land in one bucket
+# and each is compared with the bucket's first clip. Comparing against one clip keeps
+# huge buckets (thousands of near-identical idle clips) linear instead of quadratic.
+def near_duplicates(paths, signatures, threshold):
+    rows = MINHASH_SIZE // LSH_BANDS
+    count = len(paths)
+    parent = list(range(count))
+
+    def find(position):
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    for band in range(LSH_BANDS):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, rows * signatures.itemsize))).ravel()
+        _, first_index, inverse, bucket_sizes = np.unique(keys, return_index=True, return_inverse=True,
+                                                          return_counts=True)
+        inverse = inverse.ravel()
+        firsts = first_index[inverse]
+        candidates = np.nonzero((bucket_sizes[inverse] > 1) & (firsts != np.arange(count)))[0]
+        similarity = (signatures[candidates] == signatures[firsts[candidates]]).mean(axis=1)
+        for second in candidates[similarity >= threshold]:
+            parent[find(int(second))] = find(int(firsts[second]))
+
+    groups = defaultdict(list)
+    for position in range(count):
+        groups[find(position)].append(paths[position])
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate clips.")
+    parser.add_argument('--config', default=config_file_path, help="Configuration file (default: config.yaml)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="Processes used for fingerprinting (default: CPU count)")
+    parser.add_argument('--threshold', type=float, default=0.6,
+                        help="Estimated fingerprint similarity for near duplicates, 0-1 (default: 0.6)")
+    parser.add_argument('--exact-only', action='store_true', help="Skip near-duplicate fingerprinting")
+    parser.add_argument('--report', help="Write the duplicate groups to this JSON file")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    cache_directory = config.get('cache_directory', '.cache')
+    directory_scanner = DirectoryScanner(os.path.join(cache_directory, 'scan_manifest.json'),
+                                         workers=config.get('scan_workers', 16))
+    start_time = time.perf_counter()
+    file_paths = []
+    for key in ('input_directory', 'output_directory', 'secondary_output_directory'):
+        if config.get(key):
+            file_paths.extend(directory_scanner.scan(config[key]))
+    directory_scanner.save()
+
+    index = DedupIndex(os.path.join(cache_directory, 'dedup.sqlite'))
+    stats = index.sync(file_paths)
+    print(f"Scanned {len(stats)} files in {time.perf_counter() - start_time:.1f} s")
+
+    start_time = time.perf_counter()
+    exact_groups = exact_duplicates(index, stats, workers=max(args.workers, 4))
+    print(f"Exact duplicates: {len(exact_groups)} groups ({time.perf_counter() - start_time:.1f} s)")
+
+    near_groups = []
+    if not args.exact_only:
+        start_time = time.perf_counter()
+        pending = index.unfingerprinted()
+        failed = 0
+        with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+            results = []
+            for file_path, signature, error in executor.map(fingerprint_file, pending, chunksize=64):
+                if error is not None:
+                    failed += 1
+                    print(f"Error: {file_path}: {error}", file=sys.stderr)
+                results.append((file_path, signature))
+                if len(results) >= 1000:
+                    index.set_minhashes(results)
+                    results = []
+            index.set_minhashes(results)
+        fingerprint_seconds = time.perf_counter() - start_time
+        print(f"Fingerprinted {len(pending)} new or changed files in {fingerprint_seconds:.1f} s "
+              f"({len(pending) / max(fingerprint_seconds, 1e-9):.0f} files/s, {failed} failed)")
+
+        # Copies that are byte-identical are already reported above
+        exact_members = {path for group in exact_groups for path in group[1:]}
+        paths, signatures = index.minhashes()
+        keep = np.array([path not in exact_members for path in paths], dtype=bool)
+        near_groups = near_duplicates([path for path, kept in zip(paths, keep) if kept], signatures[keep],
+                                      args.threshold)
+        print(f"Near duplicates: {len(near_groups)} groups")
+
+    for title, groups in (("Exact", exact_groups), ("Near", near_groups)):
+        for group in groups:
+            print(f"{title}: " + " | ".join(group))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as file:
+            json.dump({'exact': exact_groups, 'near': near_groups}, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
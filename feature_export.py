@@ -0,0 +1,298 @@
+# Batch feature export of the tagged clips for training. Walks the label folders of
+# output_directory, decodes and resamples every clip in a process pool, cuts it into
+# equal-length chunks and computes log-mel or MFCC features for whole batches of chunks
+# at once with NumPy. Results go into one memory-mappable dataset:
+#
+#   features.f32   float32 rows of (n_features, frames), appended as files are added
+#   chunks.npy     live rows: row, file id, label id and offset in the file (seconds)
+#   files.json     every exported file with its (mtime, size) key, label and rows
+#   dataset.json   settings, labels and the row shape
+#
+# Re-runs only process new or changed files; rows of removed files are dropped from
+# chunks.npy and reclaimed once they make up most of features.f32.
+#
+#   python feature_export.py --output feature_dataset --features logmel
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from audio_window import WINDOW_SECONDS, audio_info, read_window
+from classification import config_file_path, load_config
+from scanner import DirectoryScanner
+
+FEATURE_KINDS = ('logmel', 'mfcc')
+N_FFT = 512
+HOP_LENGTH = 160
+TOP_DB = 80.0  # Log-mel floor below each chunk's peak, as librosa.power_to_db
+MIN_CHUNK_FRACTION = 0.5  # A trailing partial chunk is kept (zero padded) if at least this long
+BATCH_FILES = 32  # Files per worker task
+FEATURE_BATCH = 256  # Chunks featurised in one NumPy pass, which bounds its working memory (~130 MB at 1 s chunks)
+CHUNK_DTYPE = np.dtype([('row', '<i8'), ('file', '<i4'), ('label', '<i4'), ('offset', '<f4')])
+
+
+# Function to build the settings that decide the feature layout; a dataset can only be
+# extended with the settings it was created with
+def export_settings(args):
+    return {'sample_rate': args.sample_rate, 'chunk_seconds': args.chunk_seconds, 'features': args.features,
+            'n_mels': args.n_mels, 'n_mfcc': args.n_mfcc, 'n_fft': N_FFT, 'hop_length': HOP_LENGTH}
+
+
+def feature_shape(settings):
+    chunk_samples = int(round(settings['chunk_seconds'] * settings['sample_rate']))
+    n_features = settings['n_mfcc'] if settings['features'] == 'mfcc' else settings['n_mels']
+    return n_features, 1 + chunk_samples // settings['hop_length']
+
+
+@functools.lru_cache(maxsize=4)
+def mel_basis(sample_rate, n_fft, n_mels):
+    import librosa
+    return librosa.filters.mel(sr=sample_rate, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+
+
+# Function to compute features for a (batch, samples) array of equal-length chunks in one
+# pass: framed STFT, mel filterbank, dB and optionally the DCT to MFCCs. Matches librosa's
+# melspectrogram/mfcc with center=True and constant padding.
+def chunk_features(chunks, settings):
+    import scipy.fft
+    import scipy.signal
+    n_fft, hop_length = settings['n_fft'], settings['hop_length']
+    padded = np.pad(chunks, ((0, 0), (n_fft // 2, n_fft // 2)))
+    frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft, axis=1)[:, ::hop_length]
+    window = scipy.signal.get_window('hann', n_fft, fftbins=True).astype(np.float32)
+    power = np.abs(scipy.fft.rfft(frames * window, axis=-1)) ** 2  # float32 in, complex64 out
+    mel = power @ mel_basis(settings['sample_rate'], n_fft, settings['n_mels']).T
+    log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+    log_mel = np.maximum(log_mel, log_mel.max(axis=(1, 2), keepdims=True) - TOP_DB)
+    if settings['features'] == 'mfcc':
+        log_mel = scipy.fft.dct(log_mel, axis=-1, type=2, norm='ortho')[..., :settings['n_mfcc']]
+    return np.ascontiguousarray(log_mel.transpose(0, 2, 1), dtype=np.float32)  # (batch, n_features, frames)
+
+
+# Function to decode a clip as mono at sample_rate. Long files are read and resampled one
+# window at a time, so memory does not grow with the file.
+def decode_resampled(file_path, sample_rate):
+    import librosa
+    info = audio_info(file_path)
+    if info is None or info[1] <= WINDOW_SECONDS * info[0]:
+        return librosa.load(file_path, sr=sample_rate, mono=True)[0]
+    blocks = []
+    for start in np.arange(0, info[1] / info[0], WINDOW_SECONDS):
+        audio, source_rate = read_window(file_path, start, WINDOW_SECONDS)
+        blocks.append(librosa.resample(audio, orig_sr=source_rate, target_sr=sample_rate))
+    return np.concatenate(blocks)
+
+
+# Function to cut audio into equal-length chunks, zero padding the last one
+def split_chunks(audio, chunk_samples):
+    count = len(audio) // chunk_samples
+    if len(audio) - count * chunk_samples >= MIN_CHUNK_FRACTION * chunk_samples or count == 0:
+        count += 1
+    padded = np.zeros(count * chunk_samples, dtype=np.float32)
+    padded[:min(len(audio), len(padded))] = audio[:len(padded)]
+    return padded.reshape(count, chunk_samples)
+
+
+# Function to featurise a batch of files in a worker process, FEATURE_BATCH chunks at a
+# time. Returns the features of all their chunks stacked, and per file (path, chunk
+# count, error).
+def extract_batch(file_paths, settings):
+    chunk_samples = int(round(settings['chunk_seconds'] * settings['sample_rate']))
+    feature_lists, results = [], []
+    for file_path in file_paths:
+        try:
+            chunks = split_chunks(decode_resampled(file_path, settings['sample_rate']), chunk_samples)
+        except Exception as error:
+            results.append((file_path, 0, f"{type(error).__name__}: {error}"))
+            continue
+        for start in range(0, len(chunks), FEATURE_BATCH):
+            feature_lists.append(chunk_features(chunks[start:start + FEATURE_BATCH], settings))
+        results.append((file_path, len(chunks), None))
+    n_features, frames = feature_shape(settings)
+    if not feature_lists:
+        return np.zeros((0, n_features, frames), dtype=np.float32), results
+    return np.concatenate(feature_lists), results
+
+
+# On-disk dataset, loaded and saved as a whole except for the feature rows, which are only
+# ever appended to features.f32 (or copied once when compacting).
+class FeatureDataset:
+    def __init__(self, directory):
+        self.directory = directory
+        self.meta = None  # Contents of dataset.json
+        self.files = {}  # Path -> {'mtime_ns', 'size', 'label', 'rows': [first, count]}
+        self.rows = 0  # Rows in features.f32 that belong to the dataset (live or dead)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load(self, settings):
+        if os.path.exists(self.path('dataset.json')):
+            with open(self.path('dataset.json'), 'r', encoding='utf-8') as file:
+                self.meta = json.load(file)
+            with open(self.path('files.json'), 'r', encoding='utf-8') as file:
+                self.files = json.load(file)
+            self.rows = self.meta['rows']
+            if self.meta['settings'] != settings:
+                raise ValueError(f"{self.directory} was exported with {self.meta['settings']}; "
+                                 f"use --rebuild to export with different settings")
+        else:
+            os.makedirs(self.directory, exist_ok=True)
+            self.meta = {'settings': settings, 'labels': [], 'rows': 0}
+        # Drop rows a crashed run appended after the last save
+        with open(self.path('features.f32'), 'ab') as file:
+            file.truncate(self.rows * self.row_bytes())
+
+    def row_bytes(self):
+        n_features, frames = feature_shape(self.meta['settings'])
+        return n_features * frames * 4
+
+    def append(self, features):
+        with open(self.path('features.f32'), 'ab') as file:
+            file.write(features.tobytes())
+        first = self.rows
+        self.rows += len(features)
+        return first
+
+    def live_rows(self):
+        return sum(entry['rows'][1] for entry in self.files.values())
+
+    # Rewrite features.f32 with only the rows of files still in the dataset
+    def compact(self, block_rows=4096):
+        n_features, frames = feature_shape(self.meta['settings'])
+        source = np.memmap(self.path('features.f32'), dtype=np.float32, mode='r', shape=(self.rows, n_features, frames))
+        temporary_path = self.path('features.f32.tmp')
+        row = 0
+        with open(temporary_path, 'wb') as file:
+            for entry in sorted(self.files.values(), key=lambda entry: entry['rows'][0]):
+                first, count = entry['rows']
+                for offset in range(0, count, block_rows):
+                    file.write(np.ascontiguousarray(source[first + offset:first + min(offset + block_rows, count)]))
+                entry['rows'] = [row, count]
+                row += count
+        del source
+        os.replace(temporary_path, self.path('features.f32'))
+        self.rows = row
+
+    def save(self):
+        labels = sorted({entry['label'] for entry in self.files.values()})
+        label_ids = {label: label_id for label_id, label in enumerate(labels)}
+        chunk_seconds = self.meta['settings']['chunk_seconds']
+        paths = sorted(self.files)
+        chunks = np.zeros(self.live_rows(), dtype=CHUNK_DTYPE)
+        position = 0
+        for file_id, file_path in enumerate(paths):
+            first, count = self.files[file_path]['rows']
+            chunk_rows = chunks[position:position + count]
+            chunk_rows['row'] = np.arange(first, first + count)
+            chunk_rows['file'] = file_id
+            chunk_rows['label'] = label_ids[self.files[file_path]['label']]
+            chunk_rows['offset'] = np.arange(count) * chunk_seconds
+            position += count
+        self.meta.update(labels=labels, rows=self.rows, files=paths, shape=list(feature_shape(self.meta['settings'])))
+
+        # features.f32 is already complete; write the index files so a reader never sees a mix
+        np.save(self.path('chunks.npy.tmp.npy'), chunks)
+        os.replace(self.path('chunks.npy.tmp.npy'), self.path('chunks.npy'))
+        for name, content in (('files.json', self.files), ('dataset.json', self.meta)):
+            with open(self.path(name + '.tmp'), 'w', encoding='utf-8') as file:
+                json.dump(content, file)
+            os.replace(self.path(name + '.tmp'), self.path(name))
+
+
+# Function to open an exported dataset for training. Returns (features, chunks, meta):
+# features is a read-only memmap of every row, chunks the live rows with their file and
+# label ids (features[chunks['row']] are the live features), and meta has the label and
+# file names the ids refer to.
+def open_dataset(directory):
+    with open(os.path.join(directory, 'dataset.json'), 'r', encoding='utf-8') as file:
+        meta = json.load(file)
+    features = np.memmap(os.path.join(directory, 'features.f32'), dtype=np.float32, mode='r',
+                         shape=(meta['rows'], *meta['shape']))
+    return features, np.load(os.path.join(directory, 'chunks.npy')), meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export features of the tagged clips as a training dataset.")
+    parser.add_argument('--config', default=config_file_path, help="Configuration file (default: config.yaml)")
+    parser.add_argument('--output', default='feature_dataset', help="Dataset directory (default: feature_dataset)")
+    parser.add_argument('--features', choices=FEATURE_KINDS, default='logmel')
+    parser.add_argument('--sample-rate', type=int, default=16000, help="Rate every clip is resampled to")
+    parser.add_argument('--chunk-seconds', type=float, default=1.0, help="Length of each feature chunk")
+    parser.add_argument('--n-mels', type=int, default=64)
+    parser.add_argument('--n-mfcc', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                        help="Processes used for decoding and features (default: CPU count)")
+    parser.add_argument('--rebuild', action='store_true', help="Discard the existing dataset and export everything")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    output_directory = os.path.normpath(config['output_directory'])
+    settings = export_settings(args)
+    if args.rebuild:
+        for name in ('dataset.json', 'files.json', 'chunks.npy', 'features.f32'):
+            if os.path.exists(os.path.join(args.output, name)):
+                os.remove(os.path.join(args.output, name))
+    dataset = FeatureDataset(args.output)
+    try:
+        dataset.load(settings)
+    except ValueError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 2
+
+    start_time = time.perf_counter()
+    directory_scanner = DirectoryScanner(os.path.join(config.get('cache_directory', '.cache'), 'scan_manifest.json'),
+                                         workers=config.get('scan_workers', 16))
+    file_keys = {}
+    for file_path in directory_scanner.scan(output_directory):
+        label = os.path.relpath(file_path, output_directory).split(os.sep)
+        if len(label) < 2:
+            continue  # Not in a label folder
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        file_keys[file_path] = (label[0], stat.st_mtime_ns, stat.st_size)
+    directory_scanner.save()
+
+    removed = [file_path for file_path, entry in dataset.files.items()
+               if file_keys.get(file_path) != (entry['label'], entry['mtime_ns'], entry['size'])]
+    for file_path in removed:
+        del dataset.files[file_path]
+    pending = sorted(file_path for file_path in file_keys if file_path not in dataset.files)
+    print(f"Found {len(file_keys)} tagged files in {time.perf_counter() - start_time:.1f} s: "
+          f"{len(pending)} to export, {len(removed)} removed or changed")
+
+    start_time = time.perf_counter()
+    failed = 0
+    exported_rows = 0
+    batches = [pending[start:start + BATCH_FILES] for start in range(0, len(pending), BATCH_FILES)]
+    with ProcessPoolExecutor(max_workers=max(args.workers, 1)) as executor:
+        for features, results in executor.map(extract_batch, batches, [settings] * len(batches)):
+            row = dataset.append(features)
+            exported_rows += len(features)
+            for file_path, count, error in results:
+                if error is not None:
+                    failed += 1
+                    print(f"Error: {file_path}: {error}", file=sys.stderr)
+                    continue
+                label, mtime_ns, size = file_keys[file_path]
+                dataset.files[file_path] = {'label': label, 'mtime_ns': mtime_ns, 'size': size, 'rows': [row, count]}
+                row += count
+    export_seconds = time.perf_counter() - start_time
+
+    if dataset.rows > 2 * dataset.live_rows():
+        dataset.compact()
+    dataset.save()
+    print(f"Exported {len(pending) - failed} files ({exported_rows} chunks) in {export_seconds:.1f} s "
+          f"({len(pending) / max(export_seconds, 1e-9):.0f} files/s, {failed} failed)")
+    print(f"Dataset: {dataset.live_rows()} chunks of {feature_shape(settings)} {args.features}, "
+          f"{len(dataset.meta['labels'])} labels in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+from audio_features import ClipFeatures, compute_features, file_key
+
+
+# Function to turn a (path, mtime, size) file key into the content address used on disk
+def key_hash(key):
+    file_path, mtime_ns, size = key
+    return hashlib.sha1(f"{file_path}\0{size}\0{mtime_ns}".encode('utf-8')).hexdigest()
+
+
+# Persistent feature cache shared by the GUI and batch tools. One sqlite file holds the
+# MFCC matrix, min/max envelope, duration and sample rate of every clip seen so far.
+class FeatureStore:
+    def __init__(self, cache_directory):
+        os.makedirs(cache_directory, exist_ok=True)
+        self.db_path = os.path.join(cache_directory, 'features.sqlite')
+        self.local = threading.local()  # sqlite connections are per thread
+        self.connection().executescript('''
+            CREATE TABLE IF NOT EXISTS features (
+                hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                sr INTEGER NOT NULL,
+                duration REAL NOT NULL,
+                envelope_min BLOB NOT NULL,
+                envelope_max BLOB NOT NULL,
+                n_mfcc INTEGER NOT NULL,
+                mfcc BLOB NOT NULL
+            );
+        ''')
+
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self.connection().execute(
+            'SELECT sr, duration, envelope_min, envelope_max, n_mfcc, mfcc FROM features WHERE hash = ?',
+            (key_hash(key),)).fetchone()
+        if row is None:
+            return None
+        sr, duration, envelope_min, envelope_max, n_mfcc, mfcc = row
+        return ClipFeatures(sr, duration,
+                            np.frombuffer(envelope_min, dtype=np.float32),
+                            np.frombuffer(envelope_max, dtype=np.float32),
+                            np.frombuffer(mfcc, dtype=np.float32).reshape(n_mfcc, -1))
+
+    def put(self, key, features):
+        connection = self.connection()
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key_hash(key), key[0], int(features.sr), float(features.duration),
+                 features.envelope_min.astype(np.float32).tobytes(),
+                 features.envelope_max.astype(np.float32).tobytes(),
+                 features.mfcc.shape[0], np.ascontiguousarray(features.mfcc, dtype=np.float32).tobytes()))
+
+    # Return stored features for the file, decoding it only if it has not been seen before
+    def get_or_compute(self, file_path):
+        key = file_key(file_path)
+        features = self.get(key)
+        if features is None:
+            features = compute_features(file_path)
+            self.put(key, features)
+        return features
@@ -0,0 +1,165 @@
+import os
+from array import array
+import numpy as np
+from timing import timings
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac')
+
+SORT_MODES = ('name', 'path')
+
+# Root id of each row: which tree the file was found in
+ROOT_INPUT, ROOT_OUTPUT, ROOT_OTHER = 0, 1, 2
+
+REBUILD_THRESHOLD = 1000  # Batches larger than this re-sort everything instead of inserting one by one
+
+
+# Array-backed table of every listed file. Each row holds the path, its file name
+# and its root id; rows are addressed by a stable row id. For each sort mode an
+# int32 permutation of row ids gives the display order, so the list view maps a
+# row number straight to a file. Orders are built with NumPy argsorts on load and
+# patched with a binary search for single moves.
+class FileIndex:
+    def __init__(self, input_directory, output_directory):
+        self.roots = [os.path.normpath(input_directory), os.path.normpath(output_directory)]
+        self.sort_mode = 'name'
+        self.row_paths = []  # Path per row id, None once removed
+        self.row_names = []  # File name per row id
+        self.row_roots = bytearray()  # Root id per row id
+        self.row_of = {}  # Path -> row id
+        self.orders = {mode: array('i') for mode in SORT_MODES}  # Row ids in each display order
+
+    @timings.timed('index_load')
+    def load(self, paths, sort_mode=None):
+        if sort_mode is not None:
+            self.sort_mode = sort_mode
+        self.row_paths = list(dict.fromkeys(paths))
+        self.row_names = [path.rpartition(os.sep)[2] for path in self.row_paths]
+        self.row_of = {path: row for row, path in enumerate(self.row_paths)}
+
+        path_array = np.array(self.row_paths, dtype=str)
+        name_array = np.array(self.row_names, dtype=str)
+        roots = np.full(len(self.row_paths), ROOT_OTHER, dtype=np.uint8)
+        if len(path_array):
+            for root_id in (ROOT_OUTPUT, ROOT_INPUT):
+                roots[(roots == ROOT_OTHER) & np.char.startswith(path_array, self.roots[root_id] + os.sep)] = root_id
+        self.row_roots = bytearray(roots.tobytes())
+
+        self.orders['path'] = array('i', np.argsort(path_array, kind='stable').astype(np.int32).tobytes())
+        self.orders['name'] = array('i', np.lexsort((path_array, name_array)).astype(np.int32).tobytes())
+
+    def resort(self, sort_mode):
+        self.sort_mode = sort_mode
+
+    def __len__(self):
+        return len(self.orders[self.sort_mode])
+
+    def __contains__(self, path):
+        return path in self.row_of
+
+    def path_at(self, index):
+        return self.row_paths[self.orders[self.sort_mode][index]]
+
+    # Text and grey flag of a row, as shown by the file list
+    def row(self, index):
+        row = self.orders[self.sort_mode][index]
+        path = self.row_paths[row]
+        root_id = self.row_roots[row]
+        if root_id == ROOT_OTHER:
+            return path, False
+        return path[len(self.roots[root_id]) + 1:], root_id == ROOT_OUTPUT
+
+    # Number of (unclassified, classified) files currently listed
+    def counts(self):
+        listed_roots = np.frombuffer(self.row_roots, dtype=np.uint8)[np.frombuffer(self.orders['path'], dtype=np.int32)]
+        bins = np.bincount(listed_roots, minlength=3)
+        return int(bins[ROOT_INPUT] + bins[ROOT_OTHER]), int(bins[ROOT_OUTPUT])
+
+    # Paths of every classified file, in path order
+    def classified_paths(self):
+        order = np.frombuffer(self.orders['path'], dtype=np.int32)
+        rows = order[np.frombuffer(self.row_roots, dtype=np.uint8)[order] == ROOT_OUTPUT]
+        return [self.row_paths[row] for row in rows]
+
+    def row_key(self, row, sort_mode):
+        if sort_mode == 'name':
+            return self.row_names[row], self.row_paths[row]
+        return self.row_paths[row]
+
+    # Position of key in the given order (binary search)
+    def search(self, sort_mode, key):
+        order = self.orders[sort_mode]
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.row_key(order[middle], sort_mode) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def index_of(self, path):
+        row = self.row_of.get(path)
+        if row is None:
+            return None
+        return self.search(self.sort_mode, self.row_key(row, self.sort_mode))
+
+    def root_of(self, path):
+        for root_id in (ROOT_OUTPUT, ROOT_INPUT):
+            if path.startswith(self.roots[root_id] + os.sep):
+                return root_id
+        return ROOT_OTHER
+
+    def is_classified(self, path):
+        return self.root_of(path) == ROOT_OUTPUT
+
+    # True for paths that belong in the list (input tree or primary output tree)
+    def is_listed(self, path):
+        return self.root_of(path) != ROOT_OTHER
+
+    # Returns the index of the new entry in the current order, or None if already present
+    def insert(self, path):
+        if path in self.row_of:
+            return None
+        row = len(self.row_paths)
+        self.row_paths.append(path)
+        self.row_names.append(path.rpartition(os.sep)[2])
+        self.row_roots.append(self.root_of(path))
+        self.row_of[path] = row
+        for mode in SORT_MODES:
+            self.orders[mode].insert(self.search(mode, self.row_key(row, mode)), row)
+        return self.index_of(path)
+
+    # Returns the index the entry had in the current order, or None if it was not listed
+    def remove(self, path):
+        row = self.row_of.get(path)
+        if row is None:
+            return None
+        removed_index = None
+        for mode in SORT_MODES:
+            index = self.search(mode, self.row_key(row, mode))
+            del self.orders[mode][index]
+            if mode == self.sort_mode:
+                removed_index = index
+        del self.row_of[path]
+        self.row_paths[row] = None  # Row ids stay stable until the next load
+        return removed_index
+
+    # Apply a batch of external changes; returns the number of rows added plus removed.
+    # Small batches are patched in place, large ones rebuild the orders in one NumPy pass.
+    def update(self, added, removed):
+        removed = [path for path in removed if path in self.row_of]
+        added = [path for path in dict.fromkeys(added) if path not in self.row_of and self.is_listed(path)]
+        if len(added) + len(removed) > REBUILD_THRESHOLD:
+            removed_set = set(removed)
+            self.load([path for path in self.row_paths if path is not None and path not in removed_set] + added)
+        else:
+            for path in removed:
+                self.remove(path)
+            for path in added:
+                self.insert(path)
+        return len(added) + len(removed)
+
+    # Listed paths inside directory
+    def paths_under(self, directory):
+        prefix = os.path.normpath(directory) + os.sep
+        return [path for path in self.row_of if path.startswith(prefix)]
@@ -0,0 +1,165 @@
+import tkinter as tk
+import tkinter.font as tkfont
+
+SELECTED_BACKGROUND = "#3874d8"
+GREY_FOREGROUND = "grey"
+
+
+# Virtualized replacement for the file Listbox. Rows are not stored in the widget;
+# only the rows on screen are drawn, by asking the model for their text, so the
+# cost of a refresh does not depend on how many files are listed. The model needs
+# __len__ and row(index) -> (text, grey). Mirrors the Listbox calls the app uses
+# (curselection, select_set, yview, see, <<ListboxSelect>>). Rows are right aligned,
+# like the Listbox scrolled fully right, and scroll horizontally to reveal long paths.
+class VirtualFileList(tk.Frame):
+    def __init__(self, master, model, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.font = tkfont.nametofont('TkDefaultFont')
+        self.row_height = self.font.metrics('linespace') + 2
+        self.first_row = 0  # Index of the row at the top of the view
+        self.selected = None
+        self.text_items = []  # Canvas text items, reused for whichever rows are visible
+        self.x_offset = 0  # Pixels the rows are shifted right, showing the start of long paths
+        self.content_width = 0  # Width of the widest row on screen
+
+        self.scrollbar_y = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.scrollbar_x = tk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.xview)
+        self.scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=1, takefocus=True)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.selection_item = self.canvas.create_rectangle(0, 0, 0, 0, fill=SELECTED_BACKGROUND, width=0,
+                                                           state='hidden')
+
+        self.canvas.bind('<Configure>', lambda event: self.refresh())
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<MouseWheel>', lambda event: self.yview('scroll', -3 if event.delta > 0 else 3, 'units'))
+        self.canvas.bind('<Button-4>', lambda event: self.yview('scroll', -3, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.yview('scroll', 3, 'units'))
+        self.canvas.bind('<Shift-MouseWheel>', lambda event: self.xview('scroll', -3 if event.delta > 0 else 3, 'units'))
+        self.canvas.bind('<Shift-Button-4>', lambda event: self.xview('scroll', -3, 'units'))
+        self.canvas.bind('<Shift-Button-5>', lambda event: self.xview('scroll', 3, 'units'))
+        self.canvas.bind('<Up>', lambda event: self.step_selection(-1))
+        self.canvas.bind('<Down>', lambda event: self.step_selection(1))
+        self.canvas.bind('<Prior>', lambda event: self.yview('scroll', -1, 'pages'))
+        self.canvas.bind('<Next>', lambda event: self.yview('scroll', 1, 'pages'))
+
+    def set_model(self, model):
+        self.model = model
+        self.selected = None
+        self.first_row = 0
+        self.x_offset = 0
+        self.refresh()
+
+    def size(self):
+        return len(self.model)
+
+    def visible_rows(self):
+        return max(self.canvas.winfo_height() // self.row_height, 1)
+
+    # Redraw the rows on screen; call after the model changed
+    def refresh(self):
+        size = self.size()
+        visible_rows = self.visible_rows()
+        self.first_row = max(min(self.first_row, size - visible_rows), 0)
+        if self.selected is not None and self.selected >= size:
+            self.selected = None
+
+        while len(self.text_items) < visible_rows + 1:
+            self.text_items.append(self.canvas.create_text(0, 0, anchor=tk.NE, font=self.font))
+        rows = []
+        for slot in range(min(visible_rows + 1, max(size - self.first_row, 0))):
+            rows.append(self.model.row(self.first_row + slot))
+        self.content_width = max([self.font.measure(text) + 8 for text, grey in rows], default=0)
+        self.x_offset = max(min(self.x_offset, self.content_width - self.canvas.winfo_width()), 0)
+        right_edge = self.canvas.winfo_width() - 4 + self.x_offset
+        for slot, item in enumerate(self.text_items):
+            if slot >= len(rows):
+                self.canvas.itemconfigure(item, state='hidden')
+                continue
+            index = self.first_row + slot
+            text, grey = rows[slot]
+            fill = 'white' if index == self.selected else GREY_FOREGROUND if grey else 'black'
+            self.canvas.itemconfigure(item, text=text, fill=fill, state='normal')
+            self.canvas.coords(item, right_edge, slot * self.row_height + 1)
+
+        if self.selected is not None and self.first_row <= self.selected <= self.first_row + visible_rows:
+            top = (self.selected - self.first_row) * self.row_height
+            self.canvas.coords(self.selection_item, 0, top, self.canvas.winfo_width(), top + self.row_height)
+            self.canvas.itemconfigure(self.selection_item, state='normal')
+        else:
+            self.canvas.itemconfigure(self.selection_item, state='hidden')
+
+        first, last = self.yview()
+        self.scrollbar_y.set(first, last)
+        first, last = self.xview()
+        self.scrollbar_x.set(first, last)
+
+    def yview(self, *args):
+        size = self.size()
+        visible_rows = self.visible_rows()
+        if not args:
+            if size == 0:
+                return 0.0, 1.0
+            return self.first_row / size, min((self.first_row + visible_rows) / size, 1.0)
+        if args[0] == 'moveto':
+            self.first_row = int(float(args[1]) * size)
+        elif args[0] == 'scroll':
+            step = visible_rows if args[2] == 'pages' else 1
+            self.first_row += int(args[1]) * step
+        self.refresh()
+
+    # Horizontal position as in Listbox.xview, over the widest row on screen
+    def xview(self, *args):
+        view_width = self.canvas.winfo_width()
+        content_width = max(self.content_width, view_width, 1)
+        hidden_width = content_width - view_width
+        if not args:
+            return (hidden_width - self.x_offset) / content_width, (content_width - self.x_offset) / content_width
+        if args[0] == 'moveto':
+            self.x_offset = hidden_width - int(float(args[1]) * content_width)
+        elif args[0] == 'scroll':
+            step = view_width if args[2] == 'pages' else self.font.measure('0') * 2
+            self.x_offset -= int(args[1]) * step
+        self.refresh()
+
+    def yview_moveto(self, fraction):
+        self.yview('moveto', fraction)
+
+    # Scroll just enough to show the row at index
+    def see(self, index):
+        visible_rows = self.visible_rows()
+        if index < self.first_row:
+            self.first_row = index
+        elif index >= self.first_row + visible_rows:
+            self.first_row = index - visible_rows + 1
+        self.refresh()
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def select_clear(self, first=0, last=None):
+        self.selected = None
+        self.refresh()
+
+    def select_set(self, index):
+        if 0 <= index < self.size():
+            self.selected = index
+            self.refresh()
+
+    def on_click(self, event):
+        self.canvas.focus_set()
+        index = self.first_row + event.y // self.row_height
+        if index < self.size():
+            self.select_set(index)
+            self.event_generate("<<ListboxSelect>>")
+
+    def step_selection(self, step):
+        if self.selected is None:
+            return
+        index = self.selected + step
+        if 0 <= index < self.size():
+            self.select_set(index)
+            self.see(index)
+            self.event_generate("<<ListboxSelect>>")
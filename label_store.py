@@ -0,0 +1,246 @@
+import hashlib
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+# Label states: recorded but not moved yet, claimed by a commit, moved, move failed, undone
+PENDING, MOVING, MOVED, FAILED, RETRACTED = 'pending', 'moving', 'moved', 'failed', 'retracted'
+OPEN_STATES = (PENDING, MOVING)  # The file is still in the input tree but already labelled
+COUNTED_STATES = (PENDING, MOVING, MOVED)
+# Rows of this session, or of an ended session of the same annotator that left them behind
+OWN_ROWS = ('(session = ? OR (annotator = ? AND (session IS NULL OR '
+            'session NOT IN (SELECT session FROM sessions))))')
+
+
+# Function to make the "(?, ?, ...)" for an SQL IN over values
+def placeholders(values):
+    return '(' + ', '.join('?' * len(values)) + ')'
+
+
+# Shared label database for several annotators working on the same input_directory,
+# in SQLite's WAL mode so sessions read while another writes. Labels are recorded as
+# rows and the files are moved later in one batch. Each session leases the clip it has
+# open so no other session loads it, and every live session is given its own share of
+# the input files by path hash. Undo and commit only touch the session's own labels.
+class LabelStore:
+    def __init__(self, db_path, root, annotator, lease_seconds=300):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self.root = os.path.normpath(root)
+        self.annotator = annotator
+        self.session = uuid.uuid4().hex
+        self.lease_seconds = lease_seconds
+        self.connection = sqlite3.connect(db_path, timeout=10, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS labels (
+                id INTEGER PRIMARY KEY,
+                path_hash TEXT NOT NULL,
+                path TEXT NOT NULL,
+                label TEXT NOT NULL,
+                secondary INTEGER NOT NULL,
+                annotator TEXT NOT NULL,
+                time REAL NOT NULL,
+                state TEXT NOT NULL,
+                destination TEXT,
+                session TEXT
+            );
+            CREATE INDEX IF NOT EXISTS labels_path ON labels (path_hash, state);
+            CREATE INDEX IF NOT EXISTS labels_state ON labels (state, label);
+            CREATE INDEX IF NOT EXISTS labels_annotator ON labels (annotator, state, id);
+            CREATE TABLE IF NOT EXISTS leases (
+                path_hash TEXT PRIMARY KEY,
+                session TEXT NOT NULL,
+                annotator TEXT NOT NULL,
+                expires REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS leases_session ON leases (session);
+            CREATE TABLE IF NOT EXISTS sessions (
+                session TEXT PRIMARY KEY,
+                annotator TEXT NOT NULL,
+                heartbeat REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                annotator TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (annotator, key)
+            );
+        ''')
+        columns = {row[1] for row in self.connection.execute('PRAGMA table_info(labels)')}
+        if 'session' not in columns:  # Database written before labels were kept per session
+            self.connection.execute('ALTER TABLE labels ADD COLUMN session TEXT')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS labels_session ON labels (session, state, id)')
+        self.heartbeat()
+
+    # One write transaction; BEGIN IMMEDIATE takes the write lock up front so two
+    # sessions checking and then claiming the same clip cannot both succeed
+    @contextmanager
+    def transaction(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    # Path as stored: relative to the shared input directory with '/' separators, so
+    # annotators with the share mounted in different places agree on it
+    def path_key(self, file_path):
+        file_path = os.path.normpath(file_path)
+        if file_path.startswith(self.root + os.sep):
+            return os.path.relpath(file_path, self.root).replace(os.sep, '/')
+        return file_path
+
+    def local_path(self, path_key):
+        if os.path.isabs(path_key):
+            return path_key
+        return os.path.join(self.root, *path_key.split('/'))
+
+    def path_hash(self, file_path):
+        return hashlib.sha1(self.path_key(file_path).encode('utf-8')).hexdigest()
+
+    # Mark this session alive and renew its lease; call well within lease_seconds
+    def heartbeat(self):
+        now = time.time()
+        with self.transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)', (self.session, self.annotator, now))
+            connection.execute('UPDATE leases SET expires = ? WHERE session = ?', (now + self.lease_seconds, self.session))
+            connection.execute('DELETE FROM sessions WHERE heartbeat < ?', (now - self.lease_seconds,))
+            connection.execute('DELETE FROM leases WHERE expires < ?', (now,))
+
+    # Live sessions as (session, annotator), in a stable order. Two windows of the same
+    # annotator are separate sessions with separate shares.
+    def active_sessions(self):
+        cutoff = time.time() - self.lease_seconds
+        return self.connection.execute('SELECT session, annotator FROM sessions WHERE heartbeat >= ? ORDER BY session',
+                                       (cutoff,)).fetchall()
+
+    # True if file_path falls in this session's share of the work among sessions
+    def in_share(self, file_path, sessions):
+        if len(sessions) < 2 or self.session not in [session for session, annotator in sessions]:
+            return True
+        slot = int(self.path_hash(file_path)[:8], 16) % len(sessions)
+        return sessions[slot][0] == self.session
+
+    # Lease file_path to this session, giving up the one it held before. Returns None
+    # if the lease was granted, otherwise why not.
+    def lease(self, file_path):
+        path_hash = self.path_hash(file_path)
+        now = time.time()
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM leases WHERE session = ?', (self.session,))
+            holder = connection.execute('SELECT annotator FROM leases WHERE path_hash = ? AND expires >= ?',
+                                        (path_hash, now)).fetchone()
+            if holder is not None:
+                return f"{holder[0]} has it open"
+            labelled = connection.execute(
+                f"SELECT annotator, label FROM labels WHERE path_hash = ? AND state IN {placeholders(OPEN_STATES)}",
+                (path_hash, *OPEN_STATES)).fetchone()
+            if labelled is not None:
+                return f"{labelled[0]} labelled it {labelled[1]}"
+            connection.execute('INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)',
+                               (path_hash, self.session, self.annotator, now + self.lease_seconds))
+        return None
+
+    # Record a label; the file stays where it is until commit. Returns None if recorded,
+    # otherwise why not.
+    def record(self, file_path, label, secondary=False):
+        path_hash = self.path_hash(file_path)
+        now = time.time()
+        with self.transaction() as connection:
+            holder = connection.execute(
+                'SELECT annotator FROM leases WHERE path_hash = ? AND session != ? AND expires >= ?',
+                (path_hash, self.session, now)).fetchone()
+            if holder is not None:
+                return f"{holder[0]} has it open"
+            labelled = connection.execute(
+                f"SELECT annotator, label FROM labels WHERE path_hash = ? AND state IN {placeholders(OPEN_STATES)}",
+                (path_hash, *OPEN_STATES)).fetchone()
+            if labelled is not None:
+                return f"{labelled[0]} labelled it {labelled[1]}"
+            connection.execute('INSERT INTO labels (path_hash, path, label, secondary, annotator, time, state, session) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (path_hash, self.path_key(file_path), label, int(secondary), self.annotator, now,
+                                PENDING, self.session))
+            connection.execute('DELETE FROM leases WHERE path_hash = ?', (path_hash,))
+        return None
+
+    # Undo this session's latest label that has not been moved yet; returns its path or None
+    def retract_last(self):
+        with self.transaction() as connection:
+            row = connection.execute('SELECT id, path FROM labels WHERE session = ? AND state = ? '
+                                     'ORDER BY id DESC LIMIT 1', (self.session, PENDING)).fetchone()
+            if row is None:
+                return None
+            connection.execute('UPDATE labels SET state = ? WHERE id = ?', (RETRACTED, row[0]))
+        return self.local_path(row[1])
+
+    # Local paths of every file labelled but not moved yet, by any annotator
+    def labelled_paths(self):
+        return {self.local_path(path) for path, in self.connection.execute(
+            f"SELECT path FROM labels WHERE state IN {placeholders(OPEN_STATES)}", OPEN_STATES)}
+
+    # Claim this session's pending labels, and those an ended session of the same annotator
+    # left behind, for a batch of moves. Returns [(label id, local path, label, secondary)];
+    # finish each with finish_move().
+    def claim_pending(self):
+        with self.transaction() as connection:
+            rows = connection.execute(f"SELECT id, path, label, secondary FROM labels WHERE {OWN_ROWS} AND state = ? "
+                                      f"ORDER BY id", (self.session, self.annotator, PENDING)).fetchall()
+            connection.executemany('UPDATE labels SET state = ?, session = ? WHERE id = ?',
+                                   [(MOVING, self.session, row[0]) for row in rows])
+        return [(label_id, self.local_path(path), label, bool(secondary)) for label_id, path, label, secondary in rows]
+
+    # Record where claimed files are going, before they are moved; takes (destination, label id) pairs
+    def set_destinations(self, destinations):
+        with self.transaction() as connection:
+            connection.executemany('UPDATE labels SET destination = ? WHERE id = ?', destinations)
+
+    def finish_move(self, label_id, moved):
+        with self.transaction() as connection:
+            connection.execute('UPDATE labels SET state = ? WHERE id = ?', (MOVED if moved else FAILED, label_id))
+
+    # Settle moves that a crashed session of this annotator left claimed: moved if the
+    # file arrived, otherwise pending again so the next commit retries them. Moves of live
+    # sessions are left to them.
+    def recover(self):
+        with self.transaction() as connection:
+            rows = connection.execute(f"SELECT id, path, destination FROM labels WHERE session != ? AND {OWN_ROWS} "
+                                      f"AND state = ?", (self.session, self.session, self.annotator, MOVING)).fetchall()
+            for label_id, path, destination in rows:
+                moved = (destination is not None and os.path.exists(destination)
+                         and not os.path.exists(self.local_path(path)))
+                connection.execute('UPDATE labels SET state = ? WHERE id = ?', (MOVED if moved else PENDING, label_id))
+        return len(rows)
+
+    # {label: count} of labelled files, moved or not
+    def label_counts(self):
+        return dict(self.connection.execute(
+            f"SELECT label, COUNT(*) FROM labels WHERE state IN {placeholders(COUNTED_STATES)} GROUP BY label",
+            COUNTED_STATES))
+
+    # {annotator: (labelled, not moved yet)}
+    def annotator_counts(self):
+        return {annotator: (labelled, pending) for annotator, labelled, pending in self.connection.execute(
+            f"SELECT annotator, COUNT(*), SUM(state IN {placeholders(OPEN_STATES)}) FROM labels "
+            f"WHERE state IN {placeholders(COUNTED_STATES)} GROUP BY annotator", OPEN_STATES + COUNTED_STATES)}
+
+    def get_setting(self, key, default=None):
+        row = self.connection.execute('SELECT value FROM settings WHERE annotator = ? AND key = ?',
+                                      (self.annotator, key)).fetchone()
+        return default if row is None else row[0]
+
+    def set_setting(self, key, value):
+        with self.transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO settings VALUES (?, ?, ?)', (self.annotator, key, str(value)))
+
+    # End the session: drop its lease and leave the other annotators its share
+    def close(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM leases WHERE session = ?', (self.session,))
+            connection.execute('DELETE FROM sessions WHERE session = ?', (self.session,))
+        self.connection.close()
@@ -0,0 +1,97 @@
+import os
+import threading
+import numpy as np
+from audio_features import N_MFCC
+
+EMBEDDING_SIZE = 2 * (N_MFCC - 1)
+
+
+# Function to pool an MFCC matrix into a fixed-length, unit-length embedding.
+# Mean and standard deviation over time of every coefficient except c0, which mostly
+# tracks loudness rather than what the sound is.
+def mfcc_embedding(mfcc):
+    coefficients = mfcc[1:N_MFCC]
+    if coefficients.shape[1] == 0:
+        return None
+    embedding = np.concatenate((coefficients.mean(axis=1), coefficients.std(axis=1))).astype(np.float32)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else None
+
+
+# Function to read the label of a classified file from its folder under output_directory
+def label_from_path(file_path, output_directory):
+    return os.path.relpath(file_path, output_directory).split(os.sep)[0]
+
+
+# Brute-force nearest-neighbour index over clip embeddings. Vectors live in one
+# preallocated matrix that grows by doubling, so adding or removing a clip never
+# rebuilds anything and a query is a single matrix-vector product.
+class LabelIndex:
+    def __init__(self, capacity=1024):
+        self.vectors = np.zeros((capacity, EMBEDDING_SIZE), dtype=np.float32)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.labels = []  # Label per row
+        self.row_of = {}  # Path -> row
+        self.count = 0  # Rows used, including removed ones
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.row_of)
+
+    def add(self, file_path, label, embedding):
+        if embedding is None:
+            return
+        with self.lock:
+            row = self.row_of.get(file_path)
+            if row is None:
+                if self.count == len(self.vectors):
+                    self.vectors = np.concatenate((self.vectors, np.zeros_like(self.vectors)))
+                    self.live = np.concatenate((self.live, np.zeros_like(self.live)))
+                row = self.count
+                self.count += 1
+                self.labels.append(label)
+                self.row_of[file_path] = row
+            self.vectors[row] = embedding
+            self.labels[row] = label
+            self.live[row] = True
+
+    def remove(self, file_path):
+        with self.lock:
+            row = self.row_of.pop(file_path, None)
+            if row is not None:
+                self.live[row] = False
+
+    # Return up to count (label, score) pairs, scored by the summed similarity of the
+    # label's clips among the nearest neighbours of embedding
+    def suggest(self, embedding, count=3, neighbours=10, exclude_path=None):
+        if embedding is None:
+            return []
+        with self.lock:
+            scores = self.vectors[:self.count] @ embedding
+            scores[~self.live[:self.count]] = -np.inf
+            excluded_row = self.row_of.get(exclude_path)
+            if excluded_row is not None:
+                scores[excluded_row] = -np.inf
+            neighbours = min(neighbours, int(np.count_nonzero(np.isfinite(scores))))
+            if neighbours == 0:
+                return []
+            nearest = np.argpartition(-scores, neighbours - 1)[:neighbours]
+            votes = {}
+            for row in nearest:
+                votes[self.labels[row]] = votes.get(self.labels[row], 0.0) + float(scores[row])
+        ranked = sorted(votes.items(), key=lambda item: item[1], reverse=True)
+        return [(label, score / neighbours) for label, score in ranked[:count]]
+
+    # Add every classified file, reading MFCCs from the feature store (decoding on a miss).
+    # Runs on a background thread; stops early when stop_event is set.
+    def build(self, file_paths, output_directory, store, stop_event):
+        for file_path in file_paths:
+            if stop_event.is_set():
+                return
+            if file_path in self.row_of:
+                continue
+            try:
+                features = store.get_or_compute(file_path)
+            except Exception:
+                continue  # Unreadable clips are simply left out of the index
+            self.add(file_path, label_from_path(file_path, output_directory), mfcc_embedding(features.mfcc))
@@ -0,0 +1,186 @@
+import collections
+import errno
+import filecmp
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from classification import move_file
+
+
+# Append-only JSONL journal of file moves. Each line is a partial record keyed by its
+# id; later lines for the same id update earlier ones (typically 'begin' then 'done').
+class MoveJournal:
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        os.makedirs(os.path.dirname(journal_path) or '.', exist_ok=True)
+        self.lock = threading.Lock()
+
+    def record(self, entry):
+        line = json.dumps(entry) + '\n'
+        with self.lock:
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                file.write(line)
+                file.flush()
+                os.fsync(file.fileno())  # A crash must not lose the record of a started move
+
+    # Returns the merged records in the order they were first written
+    def load(self):
+        records = {}
+        if not os.path.exists(self.journal_path):
+            return []
+        with open(self.journal_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash
+                records.setdefault(entry['id'], {}).update(entry)
+        return list(records.values())
+
+    def rewrite(self, records):
+        temporary_path = self.journal_path + '.tmp'
+        with self.lock:
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                for record in records:
+                    file.write(json.dumps(record) + '\n')
+            os.replace(temporary_path, self.journal_path)
+
+
+# Runs file moves on a worker thread in submission order, journaling each one, and
+# keeps the completed moves so they can be undone in reverse order.
+class MovePipeline:
+    def __init__(self, journal_path, history=1000):
+        self.journal = MoveJournal(journal_path)
+        self.history = history
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()  # (record, error) of finished jobs for the UI thread
+        self.undo_stack = []  # Move records that can still be undone, newest last
+        self.pending = collections.Counter()  # Destinations of jobs not finished yet
+        self.lock = threading.Lock()
+        self.ids = itertools.count(int(time.time() * 1000))
+        self.recovered = self.recover()
+        self.worker = threading.Thread(target=self.run, name='move-pipeline', daemon=True)
+        self.worker.start()
+
+    def submit(self, source, destination, label, overwrite=False):
+        record = {'id': next(self.ids), 'action': 'move', 'source': source, 'destination': destination,
+                  'label': label, 'overwrite': overwrite, 'time': datetime.now().isoformat(timespec='seconds')}
+        with self.lock:
+            self.undo_stack.append(record)
+            del self.undo_stack[:-self.history]
+            self.pending[destination] += 1
+        self.jobs.put(record)
+        return record
+
+    # True while a queued or running job is moving a file to path, which may not exist yet
+    def is_pending(self, path):
+        with self.lock:
+            return path in self.pending
+
+    def pending_destinations(self):
+        with self.lock:
+            return set(self.pending)
+
+    # Queue the reverse of the most recent move; returns its record, or None if there is nothing to undo
+    def undo(self):
+        with self.lock:
+            if not self.undo_stack:
+                return None
+            move = self.undo_stack.pop()
+        record = {'id': next(self.ids), 'action': 'undo', 'undoes': move['id'], 'source': move['source'],
+                  'destination': move['destination'], 'label': move['label'], 'overwrite': False,
+                  'time': datetime.now().isoformat(timespec='seconds')}
+        with self.lock:
+            self.pending[move['source']] += 1
+        self.jobs.put(record)
+        return record
+
+    def run(self):
+        while True:
+            record = self.jobs.get()
+            if record is None:
+                self.jobs.task_done()
+                return
+            if record['action'] == 'undo':
+                source, destination = record['destination'], record['source']
+            else:
+                source, destination = record['source'], record['destination']
+            # Whatever is at the destination now is not this move's to delete on recovery
+            try:
+                stat = os.stat(destination)
+                existing = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                existing = None
+            self.journal.record(dict(record, state='begin', existing=existing))
+            error = None
+            try:
+                if existing is not None and not record['overwrite']:
+                    # The check on the UI thread was made when the move was queued
+                    raise FileExistsError(errno.EEXIST, "Destination already exists", destination)
+                move_file(source, destination, overwrite=record['overwrite'])
+            except OSError as move_error:
+                error = move_error
+                with self.lock:
+                    if record in self.undo_stack:
+                        self.undo_stack.remove(record)
+            with self.lock:
+                self.pending[destination] -= 1
+                if not self.pending[destination]:
+                    del self.pending[destination]
+            self.journal.record({'id': record['id'], 'state': 'failed' if error else 'done'})
+            self.results.put((record, error))
+            self.jobs.task_done()
+
+    # Drain finished jobs; call from the UI thread only
+    def poll(self):
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    # Finish the queued moves and stop the worker
+    def close(self):
+        self.jobs.put(None)
+        self.jobs.join()
+
+    # Settle moves a crash left half done, rebuild the undo history and compact the journal.
+    # Returns a description of every move that had to be recovered.
+    def recover(self):
+        records = self.journal.load()
+        recovered = []
+        for record in records:
+            if record.get('state') != 'begin':
+                continue
+            if record['action'] == 'undo':
+                source, destination = record['destination'], record['source']
+            else:
+                source, destination = record['source'], record['destination']
+            if os.path.exists(source) and os.path.exists(destination):
+                stat = os.stat(destination)
+                if filecmp.cmp(source, destination, shallow=False):
+                    os.remove(source)  # The copy finished but the original was not removed yet
+                    record['state'] = 'done'
+                elif record.get('existing') == [stat.st_size, stat.st_mtime_ns]:
+                    record['state'] = 'failed'  # Stopped before touching the file already there
+                else:
+                    os.remove(destination)  # Partial copy; the original is intact
+                    record['state'] = 'failed'
+            elif os.path.exists(destination):
+                record['state'] = 'done'
+            else:
+                record['state'] = 'failed'
+            recovered.append(f"{record['state']}: {source} -> {destination}")
+
+        undone = {record['undoes'] for record in records if record['action'] == 'undo' and record['state'] == 'done'}
+        self.undo_stack = [record for record in records if record['action'] == 'move' and
+                           record['state'] == 'done' and record['id'] not in undone][-self.history:]
+        self.journal.rewrite(self.undo_stack)
+        if self.undo_stack:
+            self.ids = itertools.count(max(int(time.time() * 1000), self.undo_stack[-1]['id'] + 1))
+        return recovered
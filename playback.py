@@ -0,0 +1,82 @@
+import threading
+import numpy as np
+import soundfile as sf
+from timing import timings
+
+BLOCK_FRAMES = 1024  # Frames read and handed to PortAudio per callback
+
+
+# Long-lived playback engine. One PyAudio instance serves every file; each file is
+# streamed block by block from a callback, so playback starts as soon as the first
+# block is read and can be interrupted at any time.
+class PlaybackEngine:
+    def __init__(self, block_frames=BLOCK_FRAMES):
+        self.block_frames = block_frames
+        self.pyaudio = None  # Created by warm_up() or the first play(); opening PortAudio can take seconds
+        self.stream = None
+        self.sound_file = None
+        self.gain = 1.0  # Read by the audio callback for every block
+        self.lock = threading.Lock()
+
+    # Volume in percent, as shown on the volume slider
+    def set_volume(self, volume):
+        self.gain = volume / 100.0
+
+    # Load PyAudio and open PortAudio ahead of the first play; safe to call from a background thread
+    def warm_up(self):
+        with self.lock:
+            self.open_pyaudio()
+
+    def open_pyaudio(self):
+        if self.pyaudio is None:
+            import pyaudio
+            self.pyaudio = pyaudio.PyAudio()
+        return self.pyaudio
+
+    @timings.timed('playback_start')
+    # Play file_path from start seconds; only the blocks being played are ever read
+    def play(self, file_path, start=0.0):
+        import pyaudio
+        with self.lock:
+            self.close_stream()
+            sound_file = sf.SoundFile(file_path)
+            if start > 0:
+                sound_file.seek(min(int(start * sound_file.samplerate), sound_file.frames))
+
+            def callback(in_data, frame_count, time_info, status):
+                block = sound_file.read(frame_count, dtype='float32', always_2d=True)
+                block *= self.gain
+                if len(block) < frame_count:
+                    return np.ascontiguousarray(block).tobytes(), pyaudio.paComplete
+                return np.ascontiguousarray(block).tobytes(), pyaudio.paContinue
+
+            try:
+                self.stream = self.open_pyaudio().open(format=pyaudio.paFloat32, channels=sound_file.channels,
+                                                rate=sound_file.samplerate, output=True,
+                                                frames_per_buffer=self.block_frames, stream_callback=callback)
+            except Exception:
+                sound_file.close()
+                raise
+            self.sound_file = sound_file
+
+    def stop(self):
+        with self.lock:
+            self.close_stream()
+
+    def is_playing(self):
+        with self.lock:
+            return self.stream is not None and self.stream.is_active()
+
+    def close_stream(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.sound_file is not None:
+            self.sound_file.close()
+            self.sound_file = None
+
+    def close(self):
+        self.stop()
+        if self.pyaudio is not None:
+            self.pyaudio.terminate()
@@ -0,0 +1,138 @@
+import collections
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from audio_features import compute_features, compute_window_features, features_nbytes, file_key
+
+
+# Bounded LRU cache of ClipFeatures, sized by the bytes of the arrays it holds
+class FeatureCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            features = self.entries.get(key)
+            if features is not None:
+                self.entries.move_to_end(key)
+            return features
+
+    def put(self, key, features):
+        size = features_nbytes(features)
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= features_nbytes(self.entries.pop(key))
+            if size > self.max_bytes:
+                return
+            self.entries[key] = features
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= features_nbytes(evicted)
+
+
+# Decodes files and computes their features on a worker pool ahead of navigation.
+# Finished results are queued for the UI thread to pick up with poll().
+class Prefetcher:
+    def __init__(self, cache, store=None, workers=2):
+        self.cache = cache
+        self.store = store  # Optional FeatureStore that persists features across restarts
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='prefetch')
+        self.pending = {}  # file key -> future
+        self.pending_lock = threading.Lock()
+        self.results = queue.Queue()  # (file_path, features, error) for the UI thread
+        self.window_future = None  # Latest MFCC window request of a long file
+        self.window_results = queue.Queue()  # (file_path, features, error) of finished window requests
+
+    # Returns cached or stored features for the file, or None if it still needs decoding
+    def cached(self, file_path):
+        try:
+            key = file_key(file_path)
+        except OSError:
+            return None
+        features = self.cache.get(key)
+        if features is None and self.store is not None:
+            features = self.store.get(key)
+            if features is not None:
+                self.cache.put(key, features)
+        return features
+
+    # Schedule file_paths in priority order, dropping queued work that is no longer wanted
+    def prefetch(self, file_paths):
+        keys = []
+        for file_path in file_paths:
+            try:
+                keys.append(file_key(file_path))
+            except OSError as error:
+                # Moved or deleted since the list was built; report it so the UI stops waiting
+                self.results.put((file_path, None, error))
+        wanted = set(keys)
+        with self.pending_lock:
+            for key, future in list(self.pending.items()):
+                if key not in wanted and future.cancel():
+                    del self.pending[key]
+            for key in keys:
+                if key in self.pending or self.cache.get(key) is not None:
+                    continue
+                future = self.executor.submit(self.load, key)
+                self.pending[key] = future
+                future.add_done_callback(lambda f, k=key: self.on_done(k, f))
+
+    def load(self, key):
+        features = self.cache.get(key)
+        if features is None and self.store is not None:
+            features = self.store.get(key)
+        if features is None:
+            features = compute_features(key[0])
+            if self.store is not None:
+                self.store.put(key, features)
+        self.cache.put(key, features)
+        return features
+
+    def on_done(self, key, future):
+        with self.pending_lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+        if future.cancelled():
+            return
+        error = future.exception()
+        self.results.put((key[0], None if error else future.result(), error))
+
+    # Drain finished results; call from the UI thread only
+    def poll(self):
+        return self.drain(self.results)
+
+    # Recompute the MFCC of a long file for the window at start seconds. Only the latest
+    # request matters while the user scrubs, so a queued earlier one is cancelled.
+    def load_window(self, file_path, features, start):
+        with self.pending_lock:
+            if self.window_future is not None:
+                self.window_future.cancel()
+            future = self.executor.submit(compute_window_features, file_path, features, start)
+            self.window_future = future
+        future.add_done_callback(lambda f: self.on_window_done(file_path, f))
+
+    def on_window_done(self, file_path, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        self.window_results.put((file_path, None if error else future.result(), error))
+
+    # Drain finished window requests; call from the UI thread only
+    def poll_windows(self):
+        return self.drain(self.window_results)
+
+    @staticmethod
+    def drain(results):
+        finished = []
+        while True:
+            try:
+                finished.append(results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from file_index import AUDIO_EXTENSIONS
+from timing import timings
+
+SETTLE_NS = 2 * 10 ** 9  # Directories modified this recently are listed again on the next scan
+
+
+# Finds audio files with os.scandir, listing directories concurrently. A manifest of
+# every directory's mtime and contents is kept on disk, so a later scan only lists
+# directories whose mtime changed and just stats the rest.
+class DirectoryScanner:
+    def __init__(self, manifest_path=None, workers=16):
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self.entries = {}  # directory -> [mtime_ns or None, audio file names, subdirectory names]
+        self.listed_count = 0  # Directories actually listed by the last scan
+        if manifest_path and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as file:
+                    self.entries = json.load(file)
+            except (OSError, ValueError):
+                self.entries = {}  # A damaged manifest only costs a full listing
+
+    def list_directory(self, directory):
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return directory, None, False  # Removed while scanning
+        cached = self.entries.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            return directory, cached, False
+
+        file_names = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as iterator:
+                for entry in iterator:
+                    if entry.is_dir():
+                        if not entry.is_symlink():  # Like os.walk, do not follow directory links
+                            subdirectories.append(entry.name)
+                    elif entry.name.endswith(AUDIO_EXTENSIONS):
+                        file_names.append(entry.name)
+        except OSError:
+            return directory, None, False
+        if time.time_ns() - mtime_ns < SETTLE_NS:
+            mtime_ns = None  # Could still change within the same mtime tick, so do not trust it
+        return directory, [mtime_ns, file_names, subdirectories], True
+
+    # Return every audio file below root
+    @timings.timed('scan')
+    def scan(self, root):
+        root = os.path.normpath(root)
+        file_paths = []
+        scanned = {}
+        self.listed_count = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            pending = {executor.submit(self.list_directory, root)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, entry, listed = future.result()
+                    if entry is None:
+                        continue
+                    self.listed_count += listed
+                    scanned[directory] = entry
+                    file_paths.extend(os.path.join(directory, name) for name in entry[1])
+                    for name in entry[2]:
+                        pending.add(executor.submit(self.list_directory, os.path.join(directory, name)))
+
+        # Replace everything known below root with what this scan saw
+        prefix = root + os.sep
+        for directory in [d for d in self.entries if d == root or d.startswith(prefix)]:
+            del self.entries[directory]
+        self.entries.update(scanned)
+        return file_paths
+
+    # Return the audio files below root as recorded by the last scan, without touching the
+    # disk, or None if root has not been scanned before
+    def cached_files(self, root):
+        root = os.path.normpath(root)
+        if root not in self.entries:
+            return None
+        file_paths = []
+        directories = [root]
+        while directories:
+            directory = directories.pop()
+            entry = self.entries.get(directory)
+            if entry is None:
+                continue
+            file_paths.extend(os.path.join(directory, name) for name in entry[1])
+            directories.extend(os.path.join(directory, name) for name in entry[2])
+        return file_paths
+
+    def save(self):
+        if not self.manifest_path:
+            return
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        temporary_path = self.manifest_path + '.tmp'
+        with open(temporary_path, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file)
+        os.replace(temporary_path, self.manifest_path)
@@ -0,0 +1,43 @@
+import os
+from batch_classify import plan_moves
+
+
+def make_config(tmp_path):
+    return {'output_directory': str(tmp_path / 'out'), 'secondary_output_directory': str(tmp_path / 'secondary')}
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+
+
+def test_file_already_at_destination_is_unchanged(tmp_path):
+    file_path = str(tmp_path / 'out' / 'dog' / 'a.wav')
+    touch(file_path)
+    for conflict in ('skip', 'overwrite', 'rename'):
+        assert plan_moves([(file_path, 'dog', False)], make_config(tmp_path), conflict, str(tmp_path)) == \
+            [('unchanged', file_path, file_path)]
+
+
+def test_same_name_in_one_run_is_never_overwritten(tmp_path):
+    first, second = str(tmp_path / 'in' / 's1' / 'a.wav'), str(tmp_path / 'in' / 's2' / 'a.wav')
+    touch(first)
+    touch(second)
+    destination = str(tmp_path / 'out' / 'dog' / 'a.wav')
+    rows = [(first, 'dog', False), (second, 'dog', False)]
+    assert plan_moves(rows, make_config(tmp_path), 'overwrite', str(tmp_path)) == \
+        [('move', first, destination), ('skip', second, destination)]
+    assert plan_moves(rows, make_config(tmp_path), 'rename', str(tmp_path))[1] == \
+        ('move', second, str(tmp_path / 'out' / 'dog' / 'a_1.wav'))
+
+
+def test_existing_destination_follows_conflict_policy(tmp_path):
+    file_path = str(tmp_path / 'in' / 'a.wav')
+    destination = str(tmp_path / 'secondary' / 'cat' / 'a.wav')
+    touch(file_path)
+    touch(destination)
+    plan = [plan_moves([('in/a.wav', 'cat', True)], make_config(tmp_path), conflict, str(tmp_path))[0][0]
+            for conflict in ('skip', 'overwrite')]
+    assert plan == ['skip', 'overwrite']
+    assert plan_moves([(file_path, 'missing_label', False), (str(tmp_path / 'in' / 'gone.wav'), 'dog', False)],
+                      make_config(tmp_path), 'skip', str(tmp_path))[1][0] == 'missing'
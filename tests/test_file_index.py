@@ -0,0 +1,43 @@
+import os
+from file_index import REBUILD_THRESHOLD, FileIndex
+
+
+def make_index(paths, sort_mode='name'):
+    index = FileIndex(os.path.join(os.sep, 'in'), os.path.join(os.sep, 'out'))
+    index.load([os.path.join(os.sep, *path.split('/')) for path in paths], sort_mode)
+    return index
+
+
+def listed(index):
+    return [index.path_at(position) for position in range(len(index))]
+
+
+def test_orders_and_rows():
+    index = make_index(['in/b/z.wav', 'in/a/y.wav', 'out/dog/x.wav'])
+    assert [os.path.basename(path) for path in listed(index)] == ['x.wav', 'y.wav', 'z.wav']
+    index.resort('path')
+    assert listed(index)[0] == os.path.join(os.sep, 'in', 'a', 'y.wav')
+    assert index.row(2) == (os.path.join('dog', 'x.wav'), True)
+    assert index.counts() == (2, 1)
+    assert index.classified_paths() == [os.path.join(os.sep, 'out', 'dog', 'x.wav')]
+
+
+def test_insert_and_remove_keep_orders_sorted():
+    index = make_index(['in/a.wav', 'in/c.wav'])
+    inserted = os.path.join(os.sep, 'in', 'b.wav')
+    assert index.insert(inserted) == 1
+    assert index.insert(inserted) is None
+    assert index.remove(os.path.join(os.sep, 'in', 'a.wav')) == 0
+    for sort_mode in ('name', 'path'):
+        index.resort(sort_mode)
+        assert listed(index) == [inserted, os.path.join(os.sep, 'in', 'c.wav')]
+    assert index.index_of(inserted) == 0
+
+
+def test_update_ignores_unlisted_and_rebuilds_large_batches():
+    index = make_index(['in/a.wav'])
+    assert index.update([os.path.join(os.sep, 'elsewhere', 'b.wav')], []) == 0
+    added = [os.path.join(os.sep, 'in', f'{number:05d}.wav') for number in range(REBUILD_THRESHOLD + 1)]
+    assert index.update(added, [os.path.join(os.sep, 'in', 'a.wav')]) == len(added) + 1
+    assert listed(index) == added
+    assert index.paths_under(os.path.join(os.sep, 'in')) == added
@@ -0,0 +1,80 @@
+import os
+import sqlite3
+from label_store import PENDING, LabelStore
+
+
+def open_store(tmp_path, annotator='seth'):
+    return LabelStore(str(tmp_path / 'labels.sqlite'), str(tmp_path / 'in'), annotator)
+
+
+def clip(tmp_path, name):
+    return str(tmp_path / 'in' / name)
+
+
+def test_lease_and_label_are_exclusive(tmp_path):
+    first, second = open_store(tmp_path, 'alice'), open_store(tmp_path, 'bob')
+    assert first.lease(clip(tmp_path, 'a.wav')) is None
+    assert second.lease(clip(tmp_path, 'a.wav')) == "alice has it open"
+    assert second.record(clip(tmp_path, 'a.wav'), 'dog') == "alice has it open"
+    assert first.record(clip(tmp_path, 'a.wav'), 'dog') is None
+    assert second.lease(clip(tmp_path, 'a.wav')) == "alice labelled it dog"
+    assert second.labelled_paths() == {clip(tmp_path, 'a.wav')}
+
+
+def test_windows_of_one_annotator_keep_their_own_labels(tmp_path):
+    first, second = open_store(tmp_path), open_store(tmp_path)
+    assert first.record(clip(tmp_path, 'a.wav'), 'dog') is None
+    assert second.record(clip(tmp_path, 'b.wav'), 'cat') is None
+    assert second.retract_last() == clip(tmp_path, 'b.wav')
+    assert second.retract_last() is None
+    assert second.claim_pending() == []
+    assert [row[1] for row in first.claim_pending()] == [clip(tmp_path, 'a.wav')]
+
+
+def test_shares_split_sessions_not_annotator_names(tmp_path):
+    first, second = open_store(tmp_path), open_store(tmp_path)
+    sessions = first.active_sessions()
+    assert len(sessions) == 2
+    paths = [clip(tmp_path, f'{number}.wav') for number in range(200)]
+    first_share = {path for path in paths if first.in_share(path, sessions)}
+    second_share = {path for path in paths if second.in_share(path, sessions)}
+    assert first_share and second_share
+    assert first_share | second_share == set(paths) and not first_share & second_share
+
+
+def test_recover_leaves_live_sessions_alone(tmp_path):
+    first = open_store(tmp_path)
+    assert first.record(clip(tmp_path, 'a.wav'), 'dog') is None
+    [(label_id, file_path, label, secondary)] = first.claim_pending()
+    first.set_destinations([(str(tmp_path / 'out' / 'dog' / 'a.wav'), label_id)])
+    assert open_store(tmp_path).recover() == 0
+
+
+def test_crashed_session_is_recovered_by_next_session(tmp_path):
+    crashed = open_store(tmp_path)
+    assert crashed.record(clip(tmp_path, 'a.wav'), 'dog') is None
+    assert crashed.record(clip(tmp_path, 'b.wav'), 'dog') is None
+    claimed = crashed.claim_pending()
+    destination = str(tmp_path / 'out' / 'dog' / 'a.wav')
+    os.makedirs(os.path.dirname(destination))
+    open(destination, 'w').close()  # a.wav arrived, b.wav never moved
+    crashed.set_destinations([(destination, claimed[0][0])])
+    crashed.connection.execute('DELETE FROM sessions WHERE session = ?', (crashed.session,))  # Lease ran out
+
+    restarted = open_store(tmp_path)
+    assert restarted.recover() == 2
+    assert [row[1] for row in restarted.claim_pending()] == [clip(tmp_path, 'b.wav')]
+    assert restarted.label_counts() == {'dog': 2}
+    assert restarted.annotator_counts() == {'seth': (2, 1)}
+
+
+def test_database_without_session_column_is_upgraded(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / 'labels.sqlite'))
+    connection.execute('CREATE TABLE labels (id INTEGER PRIMARY KEY, path_hash TEXT NOT NULL, path TEXT NOT NULL, '
+                       'label TEXT NOT NULL, secondary INTEGER NOT NULL, annotator TEXT NOT NULL, time REAL NOT NULL, '
+                       'state TEXT NOT NULL, destination TEXT)')
+    connection.execute("INSERT INTO labels VALUES (1, 'x', 'a.wav', 'dog', 0, 'seth', 0, ?, NULL)", (PENDING,))
+    connection.commit()
+    connection.close()
+    store = open_store(tmp_path)
+    assert [row[1] for row in store.claim_pending()] == [clip(tmp_path, 'a.wav')]
@@ -0,0 +1,76 @@
+import json
+import os
+from move_journal import MovePipeline
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as file:
+        file.write(content)
+
+
+def read_file(path):
+    with open(path) as file:
+        return file.read()
+
+
+# Write a journal holding one move that a crash left at 'begin', then recover it
+def recover_move(tmp_path, source, destination, overwrite=False, existing=None):
+    journal_path = str(tmp_path / 'moves.jsonl')
+    record = {'id': 1, 'action': 'move', 'source': source, 'destination': destination, 'label': 'dog',
+              'overwrite': overwrite, 'state': 'begin', 'existing': existing}
+    with open(journal_path, 'w') as file:
+        file.write(json.dumps(record) + '\n')
+    pipeline = MovePipeline(journal_path)
+    pipeline.close()
+    return pipeline
+
+
+def test_recover_finished_copy_removes_source(tmp_path):
+    source, destination = str(tmp_path / 'in' / 'clip.wav'), str(tmp_path / 'out' / 'dog' / 'clip.wav')
+    write_file(source, 'clip')
+    write_file(destination, 'clip')
+    pipeline = recover_move(tmp_path, source, destination)
+    assert not os.path.exists(source)
+    assert read_file(destination) == 'clip'
+    assert pipeline.recovered == [f"done: {source} -> {destination}"]
+    assert [record['id'] for record in pipeline.undo_stack] == [1]
+
+
+def test_recover_partial_copy_removes_destination(tmp_path):
+    source, destination = str(tmp_path / 'in' / 'clip.wav'), str(tmp_path / 'out' / 'dog' / 'clip.wav')
+    write_file(source, 'clip')
+    write_file(destination, 'cl')
+    pipeline = recover_move(tmp_path, source, destination)
+    assert read_file(source) == 'clip'
+    assert not os.path.exists(destination)
+    assert pipeline.recovered == [f"failed: {source} -> {destination}"]
+    assert pipeline.undo_stack == []
+
+
+def test_recover_keeps_file_that_existed_before_the_move(tmp_path):
+    source, destination = str(tmp_path / 'in' / 'clip.wav'), str(tmp_path / 'out' / 'dog' / 'clip.wav')
+    write_file(source, 'new clip')
+    write_file(destination, 'old clip')
+    stat = os.stat(destination)
+    pipeline = recover_move(tmp_path, source, destination, overwrite=True, existing=[stat.st_size, stat.st_mtime_ns])
+    assert read_file(source) == 'new clip'
+    assert read_file(destination) == 'old clip'
+    assert pipeline.recovered == [f"failed: {source} -> {destination}"]
+
+
+def test_queued_move_does_not_replace_earlier_one(tmp_path):
+    destination = str(tmp_path / 'out' / 'dog' / 'clip.wav')
+    first, second = str(tmp_path / 'in' / 's1' / 'clip.wav'), str(tmp_path / 'in' / 's2' / 'clip.wav')
+    write_file(first, 's1')
+    write_file(second, 's2')
+    pipeline = MovePipeline(str(tmp_path / 'moves.jsonl'))
+    pipeline.submit(first, destination, 'dog')
+    assert pipeline.is_pending(destination)
+    pipeline.submit(second, destination, 'dog')
+    pipeline.close()
+    errors = [error for record, error in pipeline.poll()]
+    assert errors[0] is None and isinstance(errors[1], FileExistsError)
+    assert read_file(destination) == 's1'
+    assert read_file(second) == 's2'
+    assert not pipeline.is_pending(destination)
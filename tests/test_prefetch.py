@@ -0,0 +1,12 @@
+from prefetch import FeatureCache, Prefetcher
+
+
+def test_missing_file_is_reported(tmp_path):
+    missing = str(tmp_path / 'gone.wav')
+    prefetcher = Prefetcher(FeatureCache(1 << 20))
+    prefetcher.prefetch([missing])
+    [(file_path, features, error)] = prefetcher.poll()
+    prefetcher.shutdown()
+    assert file_path == missing
+    assert features is None
+    assert isinstance(error, OSError)
@@ -0,0 +1,189 @@
+import collections
+import os
+import tkinter as tk
+import tkinter.font as tkfont
+from thumbnails import THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT
+
+SELECTED_OUTLINE = "#3874d8"
+GREY_FOREGROUND = "grey"
+CELL_PADDING = 6
+IMAGE_CACHE_SIZE = 512  # Decoded thumbnails kept around for scrolling back
+
+
+# Virtualized grid of clip thumbnails over the same model as the file list. Only the
+# cells on screen exist on the canvas; thumbnails are read from the image cache and
+# missing ones are requested from it, so scrolling cost does not depend on the number
+# of files. Supports multi-select with Ctrl-click and Shift-click for bulk classification.
+class ThumbnailGrid(tk.Frame):
+    def __init__(self, master, model, thumbnails, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.thumbnails = thumbnails
+        self.font = tkfont.nametofont('TkDefaultFont')
+        self.cell_width = THUMBNAIL_WIDTH + CELL_PADDING
+        self.cell_height = THUMBNAIL_HEIGHT + self.font.metrics('linespace') + CELL_PADDING
+        self.first_row = 0  # Grid row at the top of the view
+        self.selection = set()  # Selected paths; paths rather than indices survive moves and resorts
+        self.anchor = None  # Path the next Shift-click extends from
+        self.current = None  # Path clicked last
+        self.images = collections.OrderedDict()  # Image path -> PhotoImage, least recently shown first
+        self.cells = []  # (outline, image, text) canvas items, reused for whichever cells are visible
+
+        self.scrollbar_y = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self, background='white', highlightthickness=1, takefocus=True)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind('<Configure>', lambda event: self.refresh())
+        self.canvas.bind('<Button-1>', lambda event: self.on_click(event, 'set'))
+        self.canvas.bind('<Control-Button-1>', lambda event: self.on_click(event, 'toggle'))
+        self.canvas.bind('<Shift-Button-1>', lambda event: self.on_click(event, 'extend'))
+        self.canvas.bind('<MouseWheel>', lambda event: self.yview('scroll', -1 if event.delta > 0 else 1, 'units'))
+        self.canvas.bind('<Button-4>', lambda event: self.yview('scroll', -1, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.yview('scroll', 1, 'units'))
+        self.canvas.bind('<Prior>', lambda event: self.yview('scroll', -1, 'pages'))
+        self.canvas.bind('<Next>', lambda event: self.yview('scroll', 1, 'pages'))
+
+    def set_model(self, model):
+        self.model = model
+        self.selection.clear()
+        self.anchor = self.current = None
+        self.first_row = 0
+        self.refresh()
+
+    def columns(self):
+        return max(self.canvas.winfo_width() // self.cell_width, 1)
+
+    def rows(self):
+        return -(-len(self.model) // self.columns())
+
+    def visible_rows(self):
+        return max(self.canvas.winfo_height() // self.cell_height, 1)
+
+    # Redraw the cells on screen and request the thumbnails they and the next page need
+    def refresh(self):
+        if not self.winfo_ismapped():
+            return
+        size = len(self.model)
+        columns = self.columns()
+        visible_rows = self.visible_rows()
+        self.first_row = max(min(self.first_row, self.rows() - visible_rows), 0)
+        self.selection = {path for path in self.selection if path in self.model}
+
+        first = self.first_row * columns
+        visible = range(first, min(first + (visible_rows + 1) * columns, size))
+        while len(self.cells) < (visible_rows + 1) * columns:
+            self.cells.append((self.canvas.create_rectangle(0, 0, 0, 0, outline=SELECTED_OUTLINE, width=3),
+                               self.canvas.create_image(0, 0, anchor=tk.NW),
+                               self.canvas.create_text(0, 0, anchor=tk.NW, font=self.font)))
+
+        for slot, (outline, image, text) in enumerate(self.cells):
+            index = first + slot
+            if index not in visible:
+                for item in (outline, image, text):
+                    self.canvas.itemconfigure(item, state='hidden')
+                continue
+            path = self.model.path_at(index)
+            x = (slot % columns) * self.cell_width + CELL_PADDING // 2
+            y = (slot // columns) * self.cell_height + CELL_PADDING // 2
+            self.canvas.coords(outline, x - 2, y - 2, x + THUMBNAIL_WIDTH + 2, y + self.cell_height - CELL_PADDING + 2)
+            self.canvas.itemconfigure(outline, state='normal' if path in self.selection else 'hidden')
+            self.canvas.coords(image, x, y)
+            self.canvas.itemconfigure(image, image=self.photo(path) or '', state='normal')
+            self.canvas.coords(text, x, y + THUMBNAIL_HEIGHT)
+            self.canvas.itemconfigure(text, text=self.short_name(path), state='normal',
+                                      fill=GREY_FOREGROUND if self.model.is_classified(path) else 'black')
+
+        ahead = range(visible.stop, min(visible.stop + visible_rows * columns, size))
+        self.thumbnails.request([self.model.path_at(index) for index in (*visible, *ahead)])
+        first_fraction, last_fraction = self.yview()
+        self.scrollbar_y.set(first_fraction, last_fraction)
+
+    # File name clipped to the thumbnail width
+    def short_name(self, path):
+        name = os.path.basename(path)
+        if self.font.measure(name) <= THUMBNAIL_WIDTH:
+            return name
+        while name and self.font.measure(name + '...') > THUMBNAIL_WIDTH:
+            name = name[:-1]
+        return name + '...'
+
+    # Decoded thumbnail of path, or None while it is still being rendered
+    def photo(self, path):
+        image_path = self.thumbnails.cached(path)
+        if image_path is None:
+            return None
+        image = self.images.get(image_path)
+        if image is None:
+            try:
+                image = tk.PhotoImage(file=image_path)
+            except tk.TclError:
+                return None  # Unreadable image, render it again on the next request
+            self.images[image_path] = image
+            if len(self.images) > IMAGE_CACHE_SIZE:
+                self.images.popitem(last=False)
+        else:
+            self.images.move_to_end(image_path)
+        return image
+
+    def yview(self, *args):
+        rows = self.rows()
+        visible_rows = self.visible_rows()
+        if not args:
+            if rows == 0:
+                return 0.0, 1.0
+            return self.first_row / rows, min((self.first_row + visible_rows) / rows, 1.0)
+        if args[0] == 'moveto':
+            self.first_row = int(float(args[1]) * rows)
+        elif args[0] == 'scroll':
+            step = visible_rows if args[2] == 'pages' else 1
+            self.first_row += int(args[1]) * step
+        self.refresh()
+
+    # Scroll just enough to show the cell at index
+    def see(self, index):
+        row = index // self.columns()
+        visible_rows = self.visible_rows()
+        if row < self.first_row:
+            self.first_row = row
+        elif row >= self.first_row + visible_rows:
+            self.first_row = row - visible_rows + 1
+        self.refresh()
+
+    # Selected paths in list order
+    def selected_paths(self):
+        return sorted(self.selection, key=self.model.index_of)
+
+    def select_only(self, path):
+        self.selection = {path} if path in self.model else set()
+        self.anchor = self.current = path if self.selection else None
+        index = self.model.index_of(path)
+        if index is not None:
+            self.see(index)
+        else:
+            self.refresh()
+
+    def on_click(self, event, mode):
+        self.canvas.focus_set()
+        column = event.x // self.cell_width
+        if column >= self.columns():
+            return
+        index = (self.first_row + event.y // self.cell_height) * self.columns() + column
+        if index >= len(self.model):
+            return
+        path = self.model.path_at(index)
+        if mode == 'toggle':
+            self.selection ^= {path}
+        elif mode == 'extend' and self.anchor in self.model:
+            anchor_index = self.model.index_of(self.anchor)
+            low, high = sorted((anchor_index, index))
+            self.selection = {self.model.path_at(i) for i in range(low, high + 1)}
+        else:
+            self.selection = {path}
+        if mode != 'extend' or self.anchor not in self.model:
+            self.anchor = path
+        self.refresh()
+        if path not in self.selection:
+            return  # Ctrl-click took it out of the selection; the current file stays as it was
+        self.current = path
+        self.event_generate("<<GridSelect>>")
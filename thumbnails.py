@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from audio_features import file_key
+from feature_store import FeatureStore, key_hash
+
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_HEIGHT = 96
+WAVEFORM_COLOR = np.array([31, 119, 180], dtype=np.uint8)  # Same blue as the waveform plot
+
+_store = None  # FeatureStore of a worker process, opened on its first thumbnail
+
+
+# Function to find where the thumbnail of a file version lives in the image cache
+def thumbnail_path(cache_directory, key):
+    digest = key_hash(key)
+    return os.path.join(cache_directory, 'thumbnails', digest[:2], digest + '.png')
+
+
+# Function to draw a clip as an RGB image: the min/max waveform on top, the MFCC below
+def render_thumbnail(features, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+    from matplotlib import colormaps  # Only needed in the render processes
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    waveform_height = height // 2
+
+    if len(features.envelope_max):
+        # Reduce the envelope to one min/max pair per pixel column
+        edges = np.linspace(0, len(features.envelope_max), width + 1).astype(int)[:-1]
+        edges = np.minimum(edges, len(features.envelope_max) - 1)
+        column_min = np.minimum.reduceat(features.envelope_min, edges)
+        column_max = np.maximum.reduceat(features.envelope_max, edges)
+        peak = max(float(np.abs(column_min).max()), float(np.abs(column_max).max()), 1e-6)
+        middle = (waveform_height - 1) / 2
+        top = np.floor(middle - column_max / peak * middle)
+        bottom = np.ceil(middle - column_min / peak * middle)
+        rows = np.arange(waveform_height)[:, None]
+        image[:waveform_height][(rows >= top) & (rows <= bottom)] = WAVEFORM_COLOR
+
+    mfcc = features.mfcc
+    if mfcc.size:
+        mfcc_height = height - waveform_height
+        rows = (np.arange(mfcc_height) * mfcc.shape[0] // mfcc_height)[::-1]  # c0 at the bottom
+        columns = np.arange(width) * mfcc.shape[1] // width
+        values = mfcc[rows][:, columns]
+        span = max(float(values.max() - values.min()), 1e-6)
+        image[waveform_height:] = colormaps['coolwarm']((values - values.min()) / span, bytes=True)[..., :3]
+    return image
+
+
+# Function to render one thumbnail into the image cache. Runs in a worker process; the
+# features come from the shared feature store, so clips already viewed are not decoded again.
+def make_thumbnail(file_path, image_path, cache_directory, width, height):
+    global _store
+    from matplotlib.image import imsave
+    if _store is None:
+        _store = FeatureStore(cache_directory)
+    image = render_thumbnail(_store.get_or_compute(file_path), width, height)
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    temporary_path = f"{image_path}.{os.getpid()}.tmp"
+    imsave(temporary_path, image, format='png')
+    os.replace(temporary_path, image_path)  # Readers never see a half-written image
+    return image_path
+
+
+# On-disk thumbnail cache filled by a process pool. Rendering is CPU bound (decoding and
+# MFCC), so processes rather than threads keep the UI responsive while a grid fills in.
+# Finished images are queued for the UI thread to pick up with poll().
+class ThumbnailCache:
+    def __init__(self, cache_directory, workers=None, width=THUMBNAIL_WIDTH, height=THUMBNAIL_HEIGHT):
+        self.cache_directory = cache_directory
+        self.workers = workers
+        self.width = width
+        self.height = height
+        self.executor = None  # Started on the first request, so the pool costs nothing until the grid is used
+        self.image_paths = {}  # File key -> thumbnail path
+        self.pending = {}  # file key -> future
+        self.pending_lock = threading.Lock()
+        self.failed = set()  # File keys that could not be rendered; not retried until the file changes
+        self.results = queue.Queue()  # (file_path, image_path, error) for the UI thread
+
+    def image_path(self, key):
+        image_path = self.image_paths.get(key)
+        if image_path is None:
+            image_path = self.image_paths[key] = thumbnail_path(self.cache_directory, key)
+        return image_path
+
+    # Returns the thumbnail of the file if it has been rendered, else None
+    def cached(self, file_path):
+        try:
+            image_path = self.image_path(file_key(file_path))
+        except OSError:
+            return None
+        return image_path if os.path.exists(image_path) else None
+
+    # Schedule file_paths in priority order, dropping queued work that is no longer wanted
+    def request(self, file_paths):
+        keys = []
+        for file_path in file_paths:
+            try:
+                keys.append(file_key(file_path))
+            except OSError:
+                continue  # File was moved or deleted since the list was built
+        wanted = set(keys)
+        with self.pending_lock:
+            for key, future in list(self.pending.items()):
+                if key not in wanted and future.cancel():
+                    del self.pending[key]
+            for key in keys:
+                if key in self.pending or key in self.failed or os.path.exists(self.image_path(key)):
+                    continue
+                if self.executor is None:
+                    # Spawned, not forked: the UI process has prefetch, label-index and audio threads
+                    # running, and a forked child could inherit one of their locks held
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+                future = self.executor.submit(make_thumbnail, key[0], self.image_path(key), self.cache_directory,
+                                              self.width, self.height)
+                self.pending[key] = future
+                future.add_done_callback(lambda f, k=key: self.on_done(k, f))
+
+    def on_done(self, key, future):
+        with self.pending_lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                self.failed.add(key)
+        self.results.put((key[0], None if error else future.result(), error))
+
+    # Drain finished results; call from the UI thread only
+    def poll(self):
+        finished = []
+        while True:
+            try:
+                finished.append(self.results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
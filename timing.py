@@ -0,0 +1,71 @@
+import collections
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+WINDOW = 200  # Most recent samples kept per stage for the rolling percentiles
+
+
+# Rolling per-stage timings for the annotation hot path. Recording is a perf_counter
+# call and a deque append under a lock, so it can stay on in normal use; percentiles
+# are only computed when someone looks at them.
+class Timings:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.samples = {}  # Stage name -> deque of seconds, newest last
+        self.counts = collections.Counter()  # Stage name -> samples recorded since start
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            samples = self.samples.get(stage)
+            if samples is None:
+                samples = self.samples[stage] = collections.deque(maxlen=self.window)
+            samples.append(seconds)
+            self.counts[stage] += 1
+
+    @contextmanager
+    def measure(self, stage):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start_time)
+
+    # Decorator form of measure()
+    def timed(self, stage):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.measure(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # (count, p50, p95) in seconds for every stage seen so far, in the order first seen
+    def percentiles(self):
+        with self.lock:
+            stages = [(stage, list(samples)) for stage, samples in self.samples.items()]
+        rows = []
+        for stage, samples in stages:
+            values = sorted(samples)
+            if values:
+                rows.append((stage, self.counts[stage], values[len(values) // 2],
+                             values[min(int(len(values) * 0.95), len(values) - 1)]))
+        return rows
+
+    # One line per stage, for the timings panel and the benchmark output
+    def summary(self):
+        lines = [f"{'stage':<18} {'count':>7} {'p50 ms':>9} {'p95 ms':>9}"]
+        for stage, count, p50, p95 in self.percentiles():
+            lines.append(f"{stage:<18} {count:>7} {p50 * 1000:>9.1f} {p95 * 1000:>9.1f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+
+
+timings = Timings()  # Shared by the app, its workers and the benchmarks
@@ -0,0 +1,196 @@
+import time
+import tkinter as tk
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.patches import Rectangle
+from audio_features import N_MFCC, envelope_pyramid, is_windowed, mfcc_span
+from timing import timings
+
+MIN_VIEW_BINS = 8  # How far the waveform can be zoomed in, in finest envelope bins
+
+
+# Waveform figure built once; update() only replaces the envelope polygon.
+# The polygon is drawn from the pyramid level with about one bin per pixel of the
+# visible time range, so redraw cost does not depend on the clip length.
+class WaveformPlot:
+    def __init__(self):
+        self.figure = Figure(figsize=(5, 2))
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title("Waveform")
+        self.ax.set_xlabel("Time")
+        self.polygon, = self.ax.fill([0, 0], [0, 0])
+        # Time range covered by the MFCC of a long file, and where playback starts
+        self.window_patch = Rectangle((0, 0), 0, 1, transform=self.ax.get_xaxis_transform(), color='orange',
+                                      alpha=0.2, visible=False)
+        self.ax.add_patch(self.window_patch)
+        self.cursor = self.ax.axvline(0, color='red', linewidth=1, visible=False)
+        self.features = None
+        self.levels = []
+        self.bin_seconds = 0  # Length of one bin of the finest level
+        self.level = 0  # Pyramid level currently on screen
+
+    def update(self, features):
+        self.features = features
+        if features is None or len(features.envelope_max) == 0:
+            self.features = None
+            self.polygon.set_visible(False)
+            return
+        self.levels = envelope_pyramid(features.envelope_min, features.envelope_max)
+        self.bin_seconds = max(features.duration, 1e-6) / len(features.envelope_max)
+        peak = max(float(np.abs(features.envelope_min).max()), float(np.abs(features.envelope_max).max()), 1e-6)
+        self.ax.set_ylim(-peak * 1.05, peak * 1.05)
+        self.polygon.set_visible(True)
+        self.set_view(0, features.duration)
+
+    # Show the time range start..end (seconds), clamped to the clip
+    def set_view(self, start, end):
+        if self.features is None:
+            return
+        duration = max(self.features.duration, 1e-6)
+        span = min(max(end - start, self.bin_seconds * MIN_VIEW_BINS), duration)
+        start = min(max(start, 0), duration - span)
+        end = start + span
+        self.ax.set_xlim(start, end)
+
+        pixel_width = max(int(self.ax.bbox.width), 1)
+        level = 0
+        while level + 1 < len(self.levels) and span / (self.bin_seconds * 2 ** (level + 1)) >= pixel_width:
+            level += 1
+        self.level = level
+
+        level_min, level_max = self.levels[level]
+        bin_seconds = self.bin_seconds * 2 ** level
+        first = max(int(start / bin_seconds) - 1, 0)
+        last = min(int(np.ceil(end / bin_seconds)) + 1, len(level_max))
+        times = np.arange(first, last) * bin_seconds
+        # Outline the upper envelope left to right, then the lower one back again
+        self.polygon.set_xy(np.column_stack((np.concatenate((times, times[::-1])),
+                                             np.concatenate((level_max[first:last], level_min[first:last][::-1])))))
+
+    # Zoom around center (seconds); factor < 1 zooms in
+    def zoom(self, center, factor):
+        start, end = self.ax.get_xlim()
+        self.set_view(center - (center - start) * factor, center + (end - center) * factor)
+
+    def reset_view(self):
+        if self.features is not None:
+            self.set_view(0, self.features.duration)
+
+    # Shade start..end (seconds), or hide the shading when span is None
+    def set_window(self, span):
+        if span is None:
+            self.window_patch.set_visible(False)
+            return
+        self.window_patch.set_x(span[0])
+        self.window_patch.set_width(span[1] - span[0])
+        self.window_patch.set_visible(True)
+
+    # Mark the playback start position, or hide the mark when seconds is None
+    def set_cursor(self, seconds):
+        self.cursor.set_visible(seconds is not None)
+        if seconds is not None:
+            self.cursor.set_xdata([seconds, seconds])
+
+
+# MFCC figure built once; update() swaps the image data and the shared colorbar follows it
+class MfccPlot:
+    def __init__(self):
+        self.figure = Figure(figsize=(5, 2))
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title("MFCC")
+        self.ax.set_xlabel("Time")
+        self.ax.set_yticks([])
+        self.image = self.ax.imshow(np.zeros((N_MFCC, 1)), aspect='auto', origin='lower',
+                                    interpolation='nearest', cmap='coolwarm', extent=(0, 1, 0, N_MFCC))
+        self.colorbar = self.figure.colorbar(self.image, ax=self.ax)
+
+    def update(self, features):
+        if features is None or features.mfcc.size == 0:
+            self.image.set_visible(False)
+            return
+        mfcc = features.mfcc
+        start, end = mfcc_span(features)  # The whole clip, or the current window of a long file
+        end = max(end, start + 1e-6)
+        self.image.set_data(mfcc)
+        self.image.set_extent((start, end, 0, mfcc.shape[0]))
+        self.image.set_clim(float(mfcc.min()), float(mfcc.max()))
+        self.image.set_visible(True)
+        self.ax.set_xlim(start, end)
+        self.ax.set_ylim(0, mfcc.shape[0])
+
+
+# Header, waveform and MFCC widgets that live for the whole session.
+# Selecting a file only updates artist data and schedules a redraw. A click on the
+# waveform calls on_seek with the time clicked, in seconds.
+class VisualizationPanel:
+    def __init__(self, header_frame, waveform_frame, mfcc_frame, on_seek=None):
+        self.on_seek = on_seek
+        self.header_label = tk.Label(header_frame, text="", font=("Helvetica", 12, "bold"))
+        self.header_label.pack(side=tk.TOP, fill=tk.X)
+
+        self.waveform_plot = WaveformPlot()
+        self.waveform_canvas = FigureCanvasTkAgg(self.waveform_plot.figure, master=waveform_frame)
+        self.waveform_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.waveform_canvas.mpl_connect('scroll_event', self.on_waveform_scroll)
+        self.waveform_canvas.mpl_connect('button_press_event', self.on_waveform_click)
+        self.waveform_canvas.mpl_connect('resize_event', self.on_waveform_resize)
+
+        self.mfcc_plot = MfccPlot()
+        self.mfcc_canvas = FigureCanvasTkAgg(self.mfcc_plot.figure, master=mfcc_frame)
+        self.mfcc_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+        # Time from show() until both figures are actually on screen
+        self.show_time = None
+        self.undrawn = set()
+        self.waveform_canvas.mpl_connect('draw_event', lambda event: self.on_draw('waveform'))
+        self.mfcc_canvas.mpl_connect('draw_event', lambda event: self.on_draw('mfcc'))
+
+    def show(self, header_text, features):
+        self.show_time = time.perf_counter()
+        self.undrawn = {'waveform', 'mfcc'}
+        with timings.measure('plot_update'):
+            self.header_label.config(text=header_text)
+            self.waveform_plot.update(features)
+            self.waveform_plot.set_cursor(None)
+            self.show_window(features)
+        self.waveform_canvas.draw_idle()
+        self.mfcc_canvas.draw_idle()
+
+    # Update the MFCC and its shaded range after the window of a long file moved
+    def show_window(self, features):
+        self.mfcc_plot.update(features)
+        self.waveform_plot.set_window(mfcc_span(features) if features is not None and is_windowed(features) else None)
+        self.waveform_canvas.draw_idle()
+        self.mfcc_canvas.draw_idle()
+
+    def show_cursor(self, seconds):
+        self.waveform_plot.set_cursor(seconds)
+        self.waveform_canvas.draw_idle()
+
+    def on_draw(self, figure_name):
+        self.undrawn.discard(figure_name)
+        if not self.undrawn and self.show_time is not None:
+            timings.record('plot_draw', time.perf_counter() - self.show_time)
+            self.show_time = None
+
+    # Mouse wheel zooms the waveform in and out around the pointer
+    def on_waveform_scroll(self, event):
+        if event.inaxes is not self.waveform_plot.ax or event.xdata is None:
+            return
+        self.waveform_plot.zoom(event.xdata, 0.8 if event.button == 'up' else 1.25)
+        self.waveform_canvas.draw_idle()
+
+    # Double click shows the whole clip again, a single click seeks
+    def on_waveform_click(self, event):
+        if event.dblclick:
+            self.waveform_plot.reset_view()
+            self.waveform_canvas.draw_idle()
+        elif (event.button == 1 and event.inaxes is self.waveform_plot.ax and event.xdata is not None
+              and self.on_seek is not None):
+            self.on_seek(event.xdata)
+
+    # The matching pyramid level depends on the plot width in pixels
+    def on_waveform_resize(self, event):
+        self.waveform_plot.set_view(*self.waveform_plot.ax.get_xlim())
+        self.waveform_canvas.draw_idle()
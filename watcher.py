@@ -0,0 +1,251 @@
+import collections
+import ctypes
+import errno
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from file_index import AUDIO_EXTENSIONS
+from scanner import DirectoryScanner
+
+# One debounced batch of changes: paths that now exist, paths that are gone, directories
+# that are gone with everything below them, and whether events were lost (rescan needed)
+WatchBatch = collections.namedtuple('WatchBatch', ['added', 'removed', 'removed_directories', 'overflowed'])
+
+# inotify event masks, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+# Function to list the audio files below a directory that appeared after the initial scan
+def list_audio_files(directory):
+    file_paths = []
+    for dirpath, _, file_names in os.walk(directory):
+        file_paths.extend(os.path.join(dirpath, name) for name in file_names if name.endswith(AUDIO_EXTENSIONS))
+    return file_paths
+
+
+# Watches directory trees on a background thread and hands changes to the UI thread as
+# batches. Changes are only collected as dirty paths; a batch is sent once no event has
+# arrived for `debounce` seconds (or `max_delay` after the first one, for a steady
+# trickle), and each path is classified by whether it exists at that moment. A burst of
+# thousands of files therefore becomes one batch, and a file created and removed within
+# the same burst never shows up at all.
+class FileWatcher:
+    def __init__(self, roots, debounce=0.5, max_delay=2.0):
+        self.roots = [os.path.normpath(root) for root in roots]
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.changed = set()  # Audio file paths touched since the last batch
+        self.changed_directories = set()  # Directories created, moved or removed since the last batch
+        self.overflowed = False
+        self.first_change = None
+        self.last_change = None
+        self.lock = threading.Lock()
+        self.results = queue.Queue()  # WatchBatch for the UI thread
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name=type(self).__name__, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def touch(self):
+        now = time.monotonic()
+        if self.first_change is None:
+            self.first_change = now
+        self.last_change = now
+
+    def mark(self, path):
+        if path.endswith(AUDIO_EXTENSIONS):
+            with self.lock:
+                self.changed.add(path)
+                self.touch()
+
+    def mark_directory(self, directory):
+        with self.lock:
+            self.changed_directories.add(directory)
+            self.touch()
+
+    def mark_overflow(self):
+        with self.lock:
+            self.overflowed = True
+            self.touch()
+
+    # Send the collected changes if they have settled
+    def flush(self):
+        now = time.monotonic()
+        with self.lock:
+            if self.first_change is None or (now - self.last_change < self.debounce and
+                                             now - self.first_change < self.max_delay):
+                return
+            changed, self.changed = self.changed, set()
+            changed_directories, self.changed_directories = self.changed_directories, set()
+            overflowed, self.overflowed = self.overflowed, False
+            self.first_change = self.last_change = None
+
+        added, removed, removed_directories = [], [], []
+        for path in changed:
+            (added if os.path.exists(path) else removed).append(path)
+        for directory in changed_directories:
+            if os.path.isdir(directory):
+                added.extend(list_audio_files(directory))  # Moved in with its files already inside
+            else:
+                removed_directories.append(directory)
+        self.results.put(WatchBatch(added, removed, removed_directories, overflowed))
+
+    # Drain finished batches; call from the UI thread only
+    def poll(self):
+        batches = []
+        while True:
+            try:
+                batches.append(self.results.get_nowait())
+            except queue.Empty:
+                return batches
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=2)
+
+
+# Linux watcher on inotify, through ctypes so no extra package is needed. Every directory
+# below the roots gets its own watch; directories created or moved in later are added as
+# their events arrive.
+class InotifyWatcher(FileWatcher):
+    def __init__(self, roots, **kwargs):
+        super().__init__(roots, **kwargs)
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.directories = {}  # Watch descriptor -> directory
+        try:
+            for root in self.roots:
+                self.add_tree(root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, 'Out of inotify watches, raise fs.inotify.max_user_watches')
+            return  # Removed before it could be watched
+        self.directories[wd] = directory
+
+    def add_tree(self, root):
+        for dirpath, _, _ in os.walk(root):
+            self.add_watch(dirpath)
+
+    # Drop the watches of a directory moved elsewhere; they would report its old path
+    def remove_tree(self, root):
+        prefix = root + os.sep
+        for wd, directory in list(self.directories.items()):
+            if directory == root or directory.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.directories[wd]
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                readable, _, _ = select.select([self.fd], [], [], 0.1)
+                if readable:
+                    self.read_events()
+                self.flush()
+        finally:
+            os.close(self.fd)
+
+    def read_events(self):
+        try:
+            buffer = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            name = os.fsdecode(buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0'))
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.mark_overflow()
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None or mask & IN_DELETE_SELF:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        self.add_tree(path)
+                    except OSError:
+                        self.mark_overflow()  # Out of watches; changes below it would be missed
+                elif mask & IN_MOVED_FROM:
+                    self.remove_tree(path)
+                self.mark_directory(path)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE):
+                self.mark(path)  # IN_CREATE alone is skipped: the file is still being written
+
+
+# Portable fallback: every `interval` seconds the trees are rescanned with the directory
+# scanner, which only lists directories whose mtime changed, and the listings that changed
+# are diffed against the previous ones.
+class PollingWatcher(FileWatcher):
+    def __init__(self, roots, entries=None, interval=2.0, workers=4, **kwargs):
+        super().__init__(roots, **kwargs)
+        self.interval = interval
+        self.scanner = DirectoryScanner(workers=workers)
+        self.scanner.entries = dict(entries or {})  # Start from the listings the file list was built from
+
+    def run(self):
+        next_poll = 0
+        while not self.stop_event.wait(0.1):
+            if time.monotonic() >= next_poll:
+                for root in self.roots:
+                    self.poll_tree(root)
+                next_poll = time.monotonic() + self.interval
+            self.flush()
+
+    def poll_tree(self, root):
+        prefix = root + os.sep
+        previous = {directory: entry for directory, entry in self.scanner.entries.items()
+                    if directory == root or directory.startswith(prefix)}
+        if not os.path.isdir(root):
+            return
+        self.scanner.scan(root)
+        for directory, entry in self.scanner.entries.items():
+            old_entry = previous.pop(directory, None)
+            if old_entry is entry or not (directory == root or directory.startswith(prefix)):
+                continue  # Unchanged listings are the very same object
+            old_names = set(old_entry[1]) if old_entry else set()
+            for name in old_names.symmetric_difference(entry[1]):
+                self.mark(os.path.join(directory, name))
+        for directory, old_entry in previous.items():  # Directories that disappeared
+            for name in old_entry[1]:
+                self.mark(os.path.join(directory, name))
+
+
+# Function to start the best watcher for this platform over roots. entries are the
+# directory listings of the last scan, used as the starting point when polling.
+def create_watcher(roots, entries=None, poll_interval=2.0):
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots).start()
+        except (OSError, AttributeError):
+            pass  # No inotify (or out of watches); poll instead
+    return PollingWatcher(roots, entries, interval=poll_interval).start()